@@ -1,16 +1,53 @@
+"""GymBros Discord bot and the MySQL helpers shared with streamlit_app.py.
+
+The hot queries here rely on the composite indexes in
+migrations/001_hot_path_indexes.sql (active session and history lookups
+on gym_sessions, per-session log lookups and weight history); PRs read
+the trigger-maintained summary from migrations/009_personal_records_summary.sql.
+"""
 import os
+import json
+import time
+import asyncio
+import logging
+import logging.handlers
+import queue
+import functools
+import threading
+import weakref
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text, exc as sa_exc
-from datetime import datetime, date, timedelta
-from typing import List, Any, Optional
+from sqlalchemy import create_engine, text, bindparam, exc as sa_exc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Any, Callable, DefaultDict, Dict, Optional, Tuple
 
 # --- CUSTOM ERROR ---
 class DatabaseError(Exception):
     """Raised when a database operation fails unexpectedly."""
     pass
 
+log = logging.getLogger(__name__)
+
+def _setup_logging() -> logging.handlers.QueueListener:
+    """Route all records through a queue so the event loop never blocks on stderr.
+
+    Handlers only enqueue; a listener thread does the actual writes. Level comes
+    from LOG_LEVEL (default INFO). Called from the bot entry point only, so
+    importing this module (e.g. from streamlit_app.py) leaves logging untouched.
+    """
+    records = queue.SimpleQueue()
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)-8s %(name)s: %(message)s"))
+    listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    root.addHandler(logging.handlers.QueueHandler(records))
+    listener.start()
+    return listener
+
 # ---------------------------
 # LOAD ENVIRONMENT VARIABLES
 # ---------------------------
@@ -23,6 +60,23 @@ DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_NAME = os.getenv("DB_NAME")
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 
+# Connection pool sizing (tunable without code changes)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "5"))
+# pool_recycle is what replaces connections before MySQL drops them for idling,
+# so it must stay below the server's wait_timeout (default 28800s; managed
+# hosts often set far less - check SHOW VARIABLES LIKE 'wait_timeout').
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Pre-ping costs a round-trip on every checkout, so the bot leaves it off and
+# relies on pool_recycle. The dashboard can sit idle for hours with no
+# keepalive and turns it on (streamlit_app.py sets it before importing this).
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "0").lower() in ("1", "true", "yes")
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+# SQLAlchemy MySQL dialect driver: "pymysql" (pure Python, the default) or
+# "mysqldb" (mysqlclient, C row decoding; needs libmysqlclient installed).
+DB_DRIVER = os.getenv("DB_DRIVER", "pymysql")
+
 required_vars = ["DB_HOST", "DB_USER", "DB_PASSWORD", "DB_NAME", "DISCORD_TOKEN"]
 missing = [var for var in required_vars if not os.getenv(var)]
 if missing:
@@ -31,329 +85,858 @@ if missing:
 # ---------------------------
 # CREATE DATABASE ENGINE
 # ---------------------------
-DB_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}{f':{DB_PORT}' if DB_PORT else ''}/{DB_NAME}"
+DB_URL = f"mysql+{DB_DRIVER}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}{f':{DB_PORT}' if DB_PORT else ''}/{DB_NAME}"
+
+# Bound how long a new connection may hang. PyMySQL also takes a program_name,
+# which tags its connections in SHOW PROCESSLIST; mysqlclient has no such option.
+_connect_args = {"connect_timeout": DB_CONNECT_TIMEOUT}
+if DB_DRIVER == "pymysql":
+    _connect_args["program_name"] = "gymbros"
 
 engine = create_engine(
     DB_URL,
-    pool_pre_ping=True, 
-    pool_recycle=3600,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_recycle=DB_POOL_RECYCLE,
+    # Reuse the most recently returned connection first: under light load only a
+    # few connections stay hot and the rest can idle out via pool_recycle.
+    pool_use_lifo=True,
+    # Both drivers enable SO_KEEPALIVE on their TCP socket, so the OS detects
+    # dead peers out-of-band.
+    connect_args=_connect_args,
     echo=False
 )
 
+# ---------------------------
+# SQL STATEMENTS
+# ---------------------------
+# Built once at import so every call reuses the same TextClause and hits
+# SQLAlchemy's compiled-statement cache with a stable key.
+# Conditional insert: only creates a session if the user has no active one,
+# so the check and the insert are a single atomic statement. Dates and times
+# are stamped by MySQL (CURDATE()/CURTIME()) here and in the other writes.
+_SQL_START_SESSION = text("""
+    INSERT INTO gym_sessions (discord_id, discord_name, date, start_time, notes)
+    SELECT :discord_id, :discord_name, CURDATE(), CURTIME(), :notes
+    FROM DUAL
+    WHERE NOT EXISTS (
+        SELECT 1 FROM gym_sessions
+        WHERE discord_id = :discord_id AND end_time IS NULL
+    )
+""")
+
+_SQL_GET_ACTIVE_SESSION = text("""
+    SELECT session_id, date, start_time, notes
+    FROM gym_sessions
+    WHERE discord_id = :discord_id AND end_time IS NULL
+    ORDER BY session_id DESC
+    LIMIT 1;
+""")
+
+# The row start_session just inserted, read back in the same transaction so
+# active_session_cache is seeded with the date/time MySQL actually stamped.
+_SQL_GET_NEW_SESSION = text("""
+    SELECT session_id, date, start_time, notes
+    FROM gym_sessions
+    WHERE session_id = :session_id
+""")
+
+# Minutes the open session has been running, on the DB clock that stamped
+# start_time; TIMESTAMP() carries the date, so crossing midnight needs no fix-up.
+_SQL_GET_ACTIVE_SESSION_ELAPSED = text("""
+    SELECT session_id, TIMESTAMPDIFF(MINUTE, TIMESTAMP(date, start_time), NOW()) AS elapsed_mins
+    FROM gym_sessions
+    WHERE discord_id = :discord_id AND end_time IS NULL
+    ORDER BY session_id DESC
+    LIMIT 1
+""")
+
+# Only ends a session that is still open, so a stale /session_end (the session
+# was ended elsewhere meanwhile) can't overwrite its end time/calories.
+_SQL_END_SESSION = text("""
+    UPDATE gym_sessions
+    SET end_time = CURTIME(),
+        total_calories = :calories
+    WHERE session_id = :session_id AND end_time IS NULL
+""")
+
+# Logs may only land in a session that is still open. active_session_cache is
+# per process, so a session ended from the other process (bot vs dashboard) can
+# still be cached here; the guard re-checks the row in the write itself and a
+# session that has since ended inserts nothing (rowcount 0).
+_SQL_INSERT_CARDIO = text("""
+    INSERT INTO cardio_logs 
+    (session_id, discord_id, discord_name, date, machine_type, duration_minutes, distance, calories_burned, notes)
+    SELECT :session_id, :discord_id, :discord_name, CURDATE(), :machine_type, :duration, :distance, :calories, :notes
+    FROM DUAL
+    WHERE EXISTS (
+        SELECT 1 FROM gym_sessions
+        WHERE session_id = :session_id AND end_time IS NULL
+    )
+""")
+
+_SQL_INSERT_LIFT = text("""
+    INSERT INTO weightlift_logs
+    (session_id, discord_id, discord_name, date, exercise_name, muscle_group, sets, reps, weight, notes)
+    SELECT :session_id, :discord_id, :discord_name, CURDATE(), :exercise, :muscle, :sets, :reps, :weight, :notes
+    FROM DUAL
+    WHERE EXISTS (
+        SELECT 1 FROM gym_sessions
+        WHERE session_id = :session_id AND end_time IS NULL
+    )
+""")
+
+# Batch writes keep the plain VALUES form, which the drivers rewrite into one
+# multi-row INSERT (they run INSERT ... SELECT once per row). The guard runs
+# first in the same transaction instead; its shared lock makes a concurrent
+# end_session wait until the batch has committed.
+_SQL_LOCK_OPEN_SESSIONS = text("""
+    SELECT session_id FROM gym_sessions
+    WHERE session_id IN :session_ids AND end_time IS NULL
+    LOCK IN SHARE MODE
+""").bindparams(bindparam("session_ids", expanding=True))
+
+_SQL_INSERT_CARDIOS = text("""
+    INSERT INTO cardio_logs 
+    (session_id, discord_id, discord_name, date, machine_type, duration_minutes, distance, calories_burned, notes)
+    VALUES (:session_id, :discord_id, :discord_name, CURDATE(), :machine_type, :duration, :distance, :calories, :notes)
+""")
+
+_SQL_INSERT_LIFTS = text("""
+    INSERT INTO weightlift_logs
+    (session_id, discord_id, discord_name, date, exercise_name, muscle_group, sets, reps, weight, notes)
+    VALUES (:session_id, :discord_id, :discord_name, CURDATE(), :exercise, :muscle, :sets, :reps, :weight, :notes)
+""")
+
+# Session row plus its cardio/lift logs in one round-trip; the logs come back as
+# JSON arrays of objects keyed by column name.
+_SESSION_DETAILS_SELECT = """
+    SELECT
+        s.session_id, s.date, s.start_time, s.end_time, s.total_calories, s.notes,
+        (
+            SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                'machine_type', c.machine_type, 'duration_minutes', c.duration_minutes,
+                'distance', c.distance, 'calories_burned', c.calories_burned, 'notes', c.notes
+            ))
+            FROM cardio_logs c
+            WHERE c.session_id = s.session_id
+        ) AS cardio,
+        (
+            SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                'exercise_name', l.exercise_name, 'muscle_group', l.muscle_group,
+                'sets', l.sets, 'reps', l.reps, 'weight', l.weight, 'notes', l.notes
+            ))
+            FROM weightlift_logs l
+            WHERE l.session_id = s.session_id
+        ) AS lifts
+    FROM gym_sessions s
+"""
+
+_SESSION_COLUMNS = ("session_id", "date", "start_time", "end_time", "total_calories", "notes")
+
+_SQL_GET_SESSION_DETAILS = text(_SESSION_DETAILS_SELECT + """
+    WHERE s.session_id = :session_id AND s.discord_id = :discord_id
+""")
+
+_SQL_GET_ACTIVE_SESSION_DETAILS = text(_SESSION_DETAILS_SELECT + """
+    WHERE s.discord_id = :discord_id AND s.end_time IS NULL
+    ORDER BY s.session_id DESC
+    LIMIT 1
+""")
+
+# One row per exercise, kept current by a trigger on weightlift_logs
+# (migrations/009_personal_records_summary.sql).
+_SQL_PERSONAL_RECORDS = text("""
+    SELECT exercise_name, max_weight, pr_date
+    FROM personal_records
+    WHERE discord_id = :discord_id
+    ORDER BY max_weight DESC
+""")
+
+# Duration is computed server-side; sessions that cross midnight end on the next day.
+# NULL while the session is still active.
+_DURATION_MINS = """
+        TIMESTAMPDIFF(
+            MINUTE,
+            TIMESTAMP(date, start_time),
+            TIMESTAMP(IF(end_time < start_time, DATE_ADD(date, INTERVAL 1 DAY), date), end_time)
+        ) AS duration_mins"""
+
+# Uses idx_sessions_user_history (migrations/011).
+_SQL_HISTORY = text(f"""
+    SELECT
+        session_id,
+        date,{_DURATION_MINS},
+        total_calories
+    FROM gym_sessions
+    WHERE discord_id = :discord_id AND end_time IS NOT NULL
+    ORDER BY session_id DESC
+    LIMIT :limit
+""")
+
+# Uses idx_sessions_user_date (migrations/003); 25 is Discord's embed field limit.
+_SQL_TODAYS_SESSIONS = text(f"""
+    SELECT
+        session_id,
+        start_time,
+        end_time,{_DURATION_MINS},
+        total_calories
+    FROM gym_sessions
+    WHERE discord_id = :discord_id AND date = CURDATE()
+    ORDER BY session_id DESC
+    LIMIT 25
+""")
+
+# Completed-session calories per day over a trailing window (dashboard Progress
+# chart); served by idx_sessions_user_date.
+_SQL_CALORIES_BY_DAY = text("""
+    SELECT date, SUM(total_calories) AS calories
+    FROM gym_sessions
+    WHERE discord_id = :discord_id
+      AND date >= CURDATE() - INTERVAL :days DAY
+      AND end_time IS NOT NULL
+    GROUP BY date
+    ORDER BY date
+""")
+
+# Upsert on uq_weight_user_date: a second log on the same day replaces the first
+_SQL_LOG_WEIGHT = text("""
+    INSERT INTO weight_check (discord_id, date_checked, weight_kg)
+    VALUES (:discord_id, CURDATE(), :weight_kg)
+    ON DUPLICATE KEY UPDATE weight_kg = VALUES(weight_kg)
+""")
+
+_SQL_WEIGHT_HISTORY = text("""
+    SELECT date_checked, weight_kg
+    FROM weight_check
+    WHERE discord_id = :discord_id
+    ORDER BY date_checked DESC
+    LIMIT 10
+""")
+
+_SQL_PING = text("SELECT 1")
+
+# ---------------------------
+# READ CACHES
+# ---------------------------
+class _TTLCache:
+    """Tiny thread-safe TTL cache; helpers run in worker threads via asyncio.to_thread."""
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def put(self, key, value, ttl: Optional[float] = None):
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                self._data.pop(next(iter(self._data)))
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+# Read-mostly per-user results; invalidated by the matching write helper.
+# Every cache lives in its own process: the bot and the dashboard each hold
+# one, and a write only clears the copy in the process that made it. The TTL
+# is what bounds how stale a write from the other process can look.
+pr_cache = _TTLCache(ttl=60)
+weight_cache = _TTLCache(ttl=60)
+# Active session row per user; only changes on start/end, which invalidate it.
+# "No active session" is cached too, but only for NO_ACTIVE_SESSION_TTL: a
+# session started from the other process can't clear this process's entry.
+active_session_cache = _TTLCache(ttl=60)
+NO_ACTIVE_SESSION_TTL = 5.0
+_NO_ACTIVE_SESSION = object()
+# Today's sessions per user; invalidated on start/end. Keyed on the user only:
+# "today" is CURDATE() on the DB clock, which the bot's date.today() need not
+# match, so across the DB's midnight the list is at most one TTL stale.
+today_cache = _TTLCache(ttl=30)
+
+def forget_cached_reads(discord_id: int) -> None:
+    """Drop every cached read for one user, e.g. to pick up writes made by the other process."""
+    for cache in (pr_cache, weight_cache, active_session_cache, today_cache):
+        cache.pop(discord_id)
+
 # ---------------------------
 # DISCORD BOT SETUP
 # ---------------------------
+# Commands are hybrid: dispatched as slash commands through interactions, so
+# the privileged message_content intent is not needed. Prefix use still works
+# by mentioning the bot (or "!" in DMs), where Discord delivers the content.
 intents = discord.Intents.default()
-intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+bot = commands.Bot(command_prefix=commands.when_mentioned_or("!"), intents=intents)
+
+# Serializes session_start/session_end per user so double-tapped commands
+# can't race each other (no DB row locks needed). Neither waits on the user
+# while holding it, and idle users' locks are freed (see _lock_for).
+_user_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+def _lock_for(locks: "weakref.WeakValueDictionary[int, asyncio.Lock]", key: int) -> asyncio.Lock:
+    """Return the lock for key, creating it on first use.
+
+    Held in a WeakValueDictionary, so an entry disappears once no coroutine
+    holds or waits on its lock.
+    """
+    lock = locks.get(key)
+    if lock is None:
+        lock = locks[key] = asyncio.Lock()
+    return lock
+
+# Strong refs so fire-and-forget tasks aren't garbage-collected mid-run
+_background_tasks = set()
 
 # ---------------------------
 # ROBUST DATABASE HELPER FUNCTIONS (Multi-User Updated)
 # ---------------------------
+# Convention: each helper checks a connection out, runs its statements and
+# returns it to the pool before returning. Results are plain rows/dicts, so
+# callers never hold a connection open across an await and cannot starve
+# the pool.
 
-def start_session(discord_id: int, discord_name: str):
-    try:
-        with engine.begin() as conn:
-            result = conn.execute(
-                text("""
-                    INSERT INTO gym_sessions (discord_id, discord_name, date, start_time, notes)
-                    VALUES (:discord_id, :discord_name, :session_date, :start_time, :notes)
-                """),
-                {
-                    "discord_id": discord_id,
-                    "discord_name": discord_name,
-                    "session_date": date.today(),
-                    "start_time": datetime.now().strftime("%H:%M:%S"),
-                    "notes": f"Started by {discord_name}"
-                }
-            )
-            return result.lastrowid
-    except sa_exc.OperationalError as e:
-        print(f"DB Error in start_session: {e}")
-        raise DatabaseError("Could not connect to the database. Try again.")
-    except Exception as e:
-        print(f"Unexpected DB Error: {e}")
-        raise DatabaseError("An unexpected database error occurred.")
+def db_op(message: str):
+    """Log driver errors from a DB helper and re-raise them as DatabaseError(message)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            except DatabaseError:
+                raise
+            except sa_exc.OperationalError as e:
+                log.error("DB Error in %s: %s", fn.__name__, e)
+                raise DatabaseError(message) from e
+            except Exception:
+                log.exception("Unexpected DB Error in %s", fn.__name__)
+                raise DatabaseError("An unexpected database error occurred.")
+        return wrapper
+    return decorator
+
+@db_op("Could not connect to the database. Try again.")
+def start_session(discord_id: int, discord_name: str) -> Optional[int]:
+    """Start a session and return its ID, or None if one is already active."""
+    with engine.begin() as conn:
+        result = conn.execute(
+            _SQL_START_SESSION,
+            {
+                "discord_id": discord_id,
+                "discord_name": discord_name,
+                "notes": f"Started by {discord_name}"
+            }
+        )
+        session_id = result.lastrowid if result.rowcount else None
+        new_session = None
+        if session_id is not None:
+            new_session = conn.execute(_SQL_GET_NEW_SESSION, {"session_id": session_id}).fetchone()
+    active_session_cache.pop(discord_id)
+    today_cache.pop(discord_id)
+    if session_id is None:
+        return None
+    # Seed the cache so the logging commands that follow skip the lookup. The
+    # seed is only this process's view: if the session is ended from the other
+    # one, the guarded log inserts write nothing and log_to_active_session
+    # re-reads the session from the DB.
+    active_session_cache.put(discord_id, new_session)
+    return session_id
 
+@db_op("Could not retrieve active session due to database issue.")
 def get_active_session(discord_id: int):
-    try:
-        with engine.connect() as conn:
-            result = conn.execute(
-                text("""
-                    SELECT session_id, date, start_time, notes
-                    FROM gym_sessions
-                    WHERE discord_id = :discord_id AND end_time IS NULL
-                    ORDER BY session_id DESC
-                    LIMIT 1;
-                """),
-                {"discord_id": discord_id}
-            ).fetchone()
-            return result
-    except sa_exc.OperationalError as e:
-        print(f"DB Error in get_active_session: {e}")
-        raise DatabaseError("Could not retrieve active session due to database issue.")
+    cached = active_session_cache.get(discord_id)
+    if cached is _NO_ACTIVE_SESSION:
+        return None
+    if cached is not None:
+        return cached
+    with engine.connect() as conn:
+        result = conn.execute(
+            _SQL_GET_ACTIVE_SESSION,
+            {"discord_id": discord_id}
+        ).fetchone()
+    if result is not None:
+        active_session_cache.put(discord_id, result)
+    else:
+        active_session_cache.put(discord_id, _NO_ACTIVE_SESSION, ttl=NO_ACTIVE_SESSION_TTL)
+    return result
 
-def end_session(session_id: int, calories: int):
-    try:
-        with engine.begin() as conn:
-            conn.execute(
-                text("""
-                    UPDATE gym_sessions
-                    SET end_time = :end_time,
-                        total_calories = :calories
-                    WHERE session_id = :session_id
-                """),
-                {
-                    "end_time": datetime.now().strftime("%H:%M:%S"),
-                    "calories": calories,
-                    "session_id": session_id
-                }
-            )
-    except sa_exc.OperationalError as e:
-        print(f"DB Error in end_session: {e}")
-        raise DatabaseError("Could not update the session due to database issue.")
+@db_op("Could not retrieve active session due to database issue.")
+def get_active_session_elapsed(discord_id: int):
+    """Return (session_id, elapsed_mins) of the open session, or None. Never cached."""
+    with engine.connect() as conn:
+        return conn.execute(
+            _SQL_GET_ACTIVE_SESSION_ELAPSED,
+            {"discord_id": discord_id}
+        ).fetchone()
 
+@db_op("Could not update the session due to database issue.")
+def end_session(session_id: int, calories: int, discord_id: int) -> bool:
+    """End the session; returns False if it was no longer active."""
+    with engine.begin() as conn:
+        result = conn.execute(
+            _SQL_END_SESSION,
+            {
+                "calories": calories,
+                "session_id": session_id
+            }
+        )
+        ended = result.rowcount > 0
+    active_session_cache.pop(discord_id)
+    today_cache.pop(discord_id)
+    return ended
+
+def cardio_row(session_id: int, discord_id: int, discord_name: str, machine_type: str, duration: int,
+               distance: float = None, calories: int = None, notes: str = None) -> dict:
+    """Bind parameters for one cardio_logs row (see insert_cardios_db)."""
+    return {
+        "session_id": session_id,
+        "discord_id": discord_id,
+        "discord_name": discord_name,
+        "machine_type": machine_type,
+        "duration": duration,
+        "distance": distance,
+        "calories": calories,
+        "notes": notes
+    }
+
+def lift_row(session_id: int, discord_id: int, discord_name: str, exercise_name: str, muscle_group: str,
+             sets: int, reps: int, weight: int, notes: str = None) -> dict:
+    """Bind parameters for one weightlift_logs row (see add_weightlifts_db)."""
+    return {
+        "session_id": session_id,
+        "discord_id": discord_id,
+        "discord_name": discord_name,
+        "exercise": exercise_name,
+        "muscle": muscle_group,
+        "sets": sets,
+        "reps": reps,
+        "weight": weight,
+        "notes": notes
+    }
+
+def _insert_open_session_rows(conn, statement, rows: List[dict]) -> List[dict]:
+    """Insert the rows whose session is still open; returns the rows written."""
+    open_ids = {
+        row.session_id for row in conn.execute(
+            _SQL_LOCK_OPEN_SESSIONS,
+            {"session_ids": sorted({row["session_id"] for row in rows})}
+        )
+    }
+    written = [row for row in rows if row["session_id"] in open_ids]
+    if written:
+        conn.execute(statement, written)
+    return written
+
+def _forget_closed_sessions(rows: List[dict], written: List[dict]) -> None:
+    """Drop cached sessions that a guarded write found already ended."""
+    for discord_id in {row["discord_id"] for row in rows} - {row["discord_id"] for row in written}:
+        active_session_cache.pop(discord_id)
+
+@db_op("Could not log cardio due to database issue.")
 def insert_cardio_db(session_id: int, discord_id: int, discord_name: str, machine_type: str, duration: int, 
-                     distance: float = None, calories: int = None, notes: str = None):
-    try:
-        with engine.begin() as conn:
-            result = conn.execute(
-                text("""
-                    INSERT INTO cardio_logs 
-                    (session_id, discord_id, discord_name, date, machine_type, duration_minutes, distance, calories_burned, notes)
-                    VALUES (:session_id, :discord_id, :discord_name, :date, :machine_type, :duration, :distance, :calories, :notes)
-                """),
-                {
-                    "session_id": session_id,
-                    "discord_id": discord_id,
-                    "discord_name": discord_name,
-                    "date": date.today(),
-                    "machine_type": machine_type,
-                    "duration": duration,
-                    "distance": distance,
-                    "calories": calories,
-                    "notes": notes
-                }
-            )
-            return result.lastrowid
-    except sa_exc.OperationalError as e:
-        print(f"DB Error in insert_cardio_db: {e}")
-        raise DatabaseError("Could not log cardio due to database issue.")
+                     distance: float = None, calories: int = None, notes: str = None) -> Optional[int]:
+    """Log one cardio entry and return its ID, or None if the session has ended."""
+    with engine.begin() as conn:
+        result = conn.execute(
+            _SQL_INSERT_CARDIO,
+            cardio_row(session_id, discord_id, discord_name, machine_type, duration, distance, calories, notes)
+        )
+        cardio_id = result.lastrowid if result.rowcount else None
+    if cardio_id is None:
+        active_session_cache.pop(discord_id)
+    return cardio_id
 
+@db_op("Could not log cardio due to database issue.")
+def insert_cardios_db(rows: List[dict]) -> int:
+    """Insert many cardio rows (built with cardio_row) in one transaction; returns the row count.
+
+    Rows for a session that has ended are skipped, so 0 means no active session.
+    """
+    if not rows:
+        return 0
+    with engine.begin() as conn:
+        # A parameter list makes SQLAlchemy use DBAPI executemany, which
+        # PyMySQL and mysqlclient both rewrite into a single multi-row INSERT ... VALUES.
+        written = _insert_open_session_rows(conn, _SQL_INSERT_CARDIOS, rows)
+    _forget_closed_sessions(rows, written)
+    return len(written)
+
+@db_op("Could not log lift due to database issue.")
 def add_weightlift_db(session_id: int, discord_id: int, discord_name: str, exercise_name: str, muscle_group: str,
-                      sets: int, reps: int, weight: int, notes: str = None):
-    try:
-        with engine.begin() as conn:
-            result = conn.execute(
-                text("""
-                    INSERT INTO weightlift_logs
-                    (session_id, discord_id, discord_name, date, exercise_name, muscle_group, sets, reps, weight, notes)
-                    VALUES (:session_id, :discord_id, :discord_name, :date, :exercise, :muscle, :sets, :reps, :weight, :notes)
-                """),
-                {
-                    "session_id": session_id,
-                    "discord_id": discord_id,
-                    "discord_name": discord_name,
-                    "date": date.today(),
-                    "exercise": exercise_name,
-                    "muscle": muscle_group,
-                    "sets": sets,
-                    "reps": reps,
-                    "weight": weight,
-                    "notes": notes
-                }
-            )
-            return result.lastrowid
-    except sa_exc.OperationalError as e:
-        print(f"DB Error in add_weightlift_db: {e}")
-        raise DatabaseError("Could not log lift due to database issue.")
+                      sets: int, reps: int, weight: int, notes: str = None) -> Optional[int]:
+    """Log one lift and return its ID, or None if the session has ended."""
+    with engine.begin() as conn:
+        result = conn.execute(
+            _SQL_INSERT_LIFT,
+            lift_row(session_id, discord_id, discord_name, exercise_name, muscle_group, sets, reps, weight, notes)
+        )
+        lift_id = result.lastrowid if result.rowcount else None
+    if lift_id is None:
+        active_session_cache.pop(discord_id)
+    else:
+        pr_cache.pop(discord_id)
+    return lift_id
 
-def get_session_details(session_id: int):
-    try:
-        with engine.connect() as conn:
-            session = conn.execute(
-                text("""
-                    SELECT session_id, date, start_time, end_time, total_calories, notes
-                    FROM gym_sessions
-                    WHERE session_id = :session_id
-                """),
-                {"session_id": session_id}
-            ).fetchone()
-            
-            if not session:
-                return None
+@db_op("Could not log lifts due to database issue.")
+def add_weightlifts_db(rows: List[dict]) -> int:
+    """Insert many lift rows (built with lift_row) in one transaction; returns the row count.
 
-            cardio = conn.execute(
-                text("""
-                    SELECT machine_type, duration_minutes, distance, calories_burned, notes
-                    FROM cardio_logs
-                    WHERE session_id = :session_id
-                """),
-                {"session_id": session_id}
-            ).fetchall()
-
-            lifts = conn.execute(
-                text("""
-                    SELECT exercise_name, muscle_group, sets, reps, weight, notes
-                    FROM weightlift_logs
-                    WHERE session_id = :session_id
-                """),
-                {"session_id": session_id}
-            ).fetchall()
-
-            return {
-                "session": session,
-                "cardio": cardio,
-                "lifts": lifts
-            }
-    except sa_exc.OperationalError as e:
-        print(f"DB Error in get_session_details: {e}")
-        raise DatabaseError("Could not retrieve session details due to database issue.")
+    Rows for a session that has ended are skipped, so 0 means no active session.
+    """
+    if not rows:
+        return 0
+    with engine.begin() as conn:
+        written = _insert_open_session_rows(conn, _SQL_INSERT_LIFTS, rows)
+    _forget_closed_sessions(rows, written)
+    for discord_id in {row["discord_id"] for row in written}:
+        pr_cache.pop(discord_id)
+    return len(written)
+
+def _unpack_session_details(row):
+    """Split a _SESSION_DETAILS_SELECT row into the {"session", "cardio", "lifts"} dict."""
+    session = row._mapping
+    return {
+        "session": {column: session[column] for column in _SESSION_COLUMNS},
+        "cardio": json.loads(row.cardio) if row.cardio else [],
+        "lifts": json.loads(row.lifts) if row.lifts else []
+    }
 
+@db_op("Could not retrieve session details due to database issue.")
+def get_session_details(session_id: int, discord_id: int):
+    """One of the user's sessions + its logs; None if it doesn't exist or isn't theirs."""
+    with engine.connect() as conn:
+        row = conn.execute(
+            _SQL_GET_SESSION_DETAILS,
+            {"session_id": session_id, "discord_id": discord_id}
+        ).fetchone()
+        
+        if not row:
+            return None
+
+        return _unpack_session_details(row)
+
+@db_op("Could not retrieve active session due to database issue.")
+def get_active_session_details(discord_id: int):
+    """Active session + its logs in a single query (used by !current)."""
+    with engine.connect() as conn:
+        row = conn.execute(
+            _SQL_GET_ACTIVE_SESSION_DETAILS,
+            {"discord_id": discord_id}
+        ).fetchone()
+
+        if not row:
+            return None
+
+        return _unpack_session_details(row)
+
+@db_op("Could not retrieve personal records due to database issue.")
 def get_personal_records(discord_id: int):
-    try:
-        with engine.connect() as conn:
-            result = conn.execute(
-                text("""
-                    SELECT 
-                        exercise_name,
-                        MAX(weight) AS max_weight,
-                        (
-                            SELECT date 
-                            FROM weightlift_logs 
-                            WHERE exercise_name = w.exercise_name AND weight = MAX(w.weight) AND discord_id = :discord_id
-                            ORDER BY date DESC 
-                            LIMIT 1
-                        ) AS pr_date
-                    FROM weightlift_logs w
-                    WHERE discord_id = :discord_id
-                    GROUP BY exercise_name
-                    ORDER BY max_weight DESC
-                """),
-                {"discord_id": discord_id}
-            ).fetchall()
-            return result
-    except sa_exc.OperationalError as e:
-        print(f"DB Error in get_personal_records: {e}")
-        raise DatabaseError("Could not retrieve personal records due to database issue.")
+    cached = pr_cache.get(discord_id)
+    if cached is not None:
+        return cached
+    with engine.connect() as conn:
+        result = conn.execute(
+            _SQL_PERSONAL_RECORDS,
+            {"discord_id": discord_id}
+        ).fetchall()
+    pr_cache.put(discord_id, result)
+    return result
+
+@db_op("Could not retrieve session history due to database issue.")
+def get_history(discord_id: int, limit: int = 5):
+    with engine.connect() as conn:
+        result = conn.execute(
+            _SQL_HISTORY,
+            {"discord_id": discord_id, "limit": limit}
+        ).fetchall()
+        return result
+
+@db_op("Could not retrieve today's sessions due to database issue.")
+def get_todays_sessions(discord_id: int):
+    cached = today_cache.get(discord_id)
+    if cached is not None:
+        return cached
+    with engine.connect() as conn:
+        result = conn.execute(
+            _SQL_TODAYS_SESSIONS,
+            {"discord_id": discord_id}
+        ).fetchall()
+    today_cache.put(discord_id, result)
+    return result
+
+@db_op("Could not retrieve calorie totals due to database issue.")
+def get_calories_by_day(discord_id: int, days: int = 90):
+    with engine.connect() as conn:
+        result = conn.execute(
+            _SQL_CALORIES_BY_DAY,
+            {"discord_id": discord_id, "days": days}
+        ).fetchall()
+        return result
 
 # --- Weight Tracking Helpers ---
 
+@db_op("Could not log weight due to database issue.")
 def log_weight_db(discord_id: int, weight_kg: float) -> int:
-    try:
-        with engine.begin() as conn:
-            result = conn.execute(
-                text("""
-                    INSERT INTO weight_check (discord_id, date_checked, weight_kg)
-                    VALUES (:discord_id, :date_checked, :weight_kg)
-                """),
-                {
-                    "discord_id": discord_id,
-                    "date_checked": date.today(),
-                    "weight_kg": weight_kg
-                }
-            )
-            return result.lastrowid
-    except sa_exc.OperationalError as e:
-        print(f"DB Error in log_weight_db: {e}")
-        raise DatabaseError("Could not log weight due to database issue.")
+    with engine.begin() as conn:
+        result = conn.execute(
+            _SQL_LOG_WEIGHT,
+            {
+                "discord_id": discord_id,
+                # weight_kg is DECIMAL(5,2) (migrations/004)
+                "weight_kg": round(weight_kg, 2)
+            }
+        )
+        log_id = result.lastrowid
+    weight_cache.pop(discord_id)
+    return log_id
 
+@db_op("Could not retrieve weight history due to database issue.")
 def get_weight_history(discord_id: int):
+    cached = weight_cache.get(discord_id)
+    if cached is not None:
+        return cached
+    with engine.connect() as conn:
+        result = conn.execute(
+            _SQL_WEIGHT_HISTORY,
+            {"discord_id": discord_id}
+        ).fetchall()
+    weight_cache.put(discord_id, result)
+    return result
+
+def _ping_db():
+    with engine.connect() as conn:
+        conn.execute(_SQL_PING)
+
+def _warm_pool(size: int):
+    """Open `size` pooled connections up front so the first commands skip the TCP+auth handshake."""
+    connections = []
     try:
-        with engine.connect() as conn:
-            result = conn.execute(
-                text("""
-                    SELECT date_checked, weight_kg
-                    FROM weight_check
-                    WHERE discord_id = :discord_id
-                    ORDER BY date_checked DESC
-                    LIMIT 10
-                """),
-                {"discord_id": discord_id}
-            ).fetchall()
-            return result
-    except sa_exc.OperationalError as e:
-        print(f"DB Error in get_weight_history: {e}")
-        raise DatabaseError("Could not retrieve weight history due to database issue.")
+        for _ in range(size):
+            connections.append(engine.connect())
+    finally:
+        for conn in connections:
+            conn.close()
 
 # ---------------------------
 # BOT EVENTS
 # ---------------------------
 @bot.event
-async def on_ready():
-    print(f"Logged in as {bot.user}")
+async def setup_hook():
+    # The DB helpers stay synchronous (streamlit_app.py calls them directly), so
+    # handlers offload them with asyncio.to_thread. Size the loop's default
+    # executor to the connection pool so every checked-out connection can have
+    # a worker thread and queries never queue behind an undersized thread pool.
+    bot.loop.set_default_executor(
+        ThreadPoolExecutor(max_workers=DB_POOL_SIZE + DB_MAX_OVERFLOW, thread_name_prefix="gymbros-db")
+    )
+    db_keepalive.start()
+    task = asyncio.create_task(_warm_pool_in_background())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    await bot.tree.sync()
+
+async def _warm_pool_in_background():
     try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-            print("✓ Database connection successful")
+        await asyncio.to_thread(_warm_pool, DB_POOL_SIZE)
+    except Exception as e:
+        log.warning("DB pool warm-up failed: %s", e)
+
+@tasks.loop(minutes=20)
+async def db_keepalive():
+    # Surfaces a dead database in the logs between commands. It only touches
+    # one pooled connection (the LIFO-hot one); the others rely on pool_recycle.
+    try:
+        await asyncio.to_thread(_ping_db)
+    except Exception as e:
+        log.warning("DB keepalive ping failed: %s", e)
+
+async def _verify_db():
+    try:
+        await asyncio.to_thread(_ping_db)
+        log.info("✓ Database connection successful")
     except sa_exc.OperationalError as e:
-        print(f"✗ Database connection failed. Fatal Error: {e}")
+        log.error("✗ Database connection failed. Fatal Error: %s", e)
     except Exception as e:
-        print(f"✗ An unexpected error occurred during setup: {e}")
-    print("Bot is now running!")
+        log.exception("✗ An unexpected error occurred during setup: %s", e)
+
+@bot.event
+async def on_ready():
+    log.info("Logged in as %s", bot.user)
+    # Report DB reachability in the background; commands are served right away
+    task = asyncio.create_task(_verify_db())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    log.info("Bot is now running!")
 
 @bot.event
 async def on_command_error(ctx, error):
     if isinstance(error, commands.CommandNotFound):
         return
     elif isinstance(error, commands.MissingRequiredArgument):
-        await ctx.send(f"❌ Missing argument: `{error.param.name}`. Check `!command` for usage.")
+        await ctx.send(f"❌ Missing argument: `{error.param.name}`. Check `/command` for usage.")
     elif isinstance(error, commands.BadArgument):
-        await ctx.send(f"❌ Invalid argument provided! Ensure numbers are correct and check `!command`.")
+        await ctx.send(f"❌ Invalid argument provided! Ensure numbers are correct and check `/command`.")
     elif isinstance(error, DatabaseError): 
         await ctx.send(f"❌ Database Error: {error}. Please try again in a few seconds.")
     else:
-        print(f"Critical Error: {error}")
+        log.error("Critical Error in %s", ctx.command, exc_info=error)
         await ctx.send("❌ An unexpected error occurred while processing your command!")
 
 # ---------------------------
 # Aesthetic Table Helper 
 # ---------------------------
 
-def create_table(headers: List[str], rows: List[List[Any]]) -> str:
-    processed_rows = []
-    for row in rows:
-        processed_rows.append([str(cell) if cell is not None else "-" for cell in row])
-
-    col_widths = [len(h) for h in headers]
-    for row in processed_rows:
-        for i, cell in enumerate(row):
-            col_widths[i] = max(col_widths[i], len(str(cell)))
-
+@functools.lru_cache(maxsize=64)
+def _table_frame(col_widths: Tuple[int, ...]) -> Tuple[str, str, str, str]:
+    """(top, middle, bottom, row_fmt) for a table shape; !pr/!history reuse a handful of shapes."""
     def make_line(left: str, mid: str, right: str, fill: str) -> str:
         return left + mid.join([fill * (w + 2) for w in col_widths]) + right
 
-    top = make_line("┌", "┬", "┐", "─")
-    middle = make_line("├", "┼", "┤", "─")
-    bottom = make_line("└", "┴", "┘", "─")
-    
-    lines = [top]
-    header_row = "│"
-    for i, h in enumerate(headers):
-        header_row += f" {h:<{col_widths[i]}} │"
-    lines.append(header_row)
-    lines.append(middle)
-    
-    for row in processed_rows:
-        line = "│"
-        for i, cell in enumerate(row):
-            line += f" {str(cell):<{col_widths[i]}} │"
-        lines.append(line)
-    
+    return (
+        make_line("┌", "┬", "┐", "─"),
+        make_line("├", "┼", "┤", "─"),
+        make_line("└", "┴", "┘", "─"),
+        # One format template per shape; each row is then a single str.format call
+        "│ " + " │ ".join([f"{{:<{w}}}" for w in col_widths]) + " │",
+    )
+
+def create_table(headers: List[str], rows: List[List[Any]]) -> str:
+    processed_rows = [[str(cell) if cell is not None else "-" for cell in row] for row in rows]
+
+    # One pass over each column (header included) to size it
+    col_widths = tuple(max(map(len, column)) for column in zip(headers, *processed_rows))
+    top, middle, bottom, row_fmt = _table_frame(col_widths)
+
+    lines = [top, row_fmt.format(*headers), middle]
+    lines.extend([row_fmt.format(*row) for row in processed_rows])
     lines.append(bottom)
     return "\n".join(lines)
 
 
+# ---------------------------
+# Lift Batching
+# ---------------------------
+# !add_lift is usually fired many times in a row, so lifts are buffered per
+# user and written together by add_weightlifts_db (one executemany
+# transaction). A flush runs LIFT_FLUSH_DELAY seconds after the first
+# buffered lift, and eagerly before anything that reads the logs back (an
+# eager flush first waits out one already writing, so the reader sees those
+# rows too). A
+# failed timed flush keeps the rows, tells the user (once per outage) in the
+# channel they last logged from, and retries every LIFT_FLUSH_RETRY_DELAY.
+LIFT_FLUSH_DELAY = 2.0
+LIFT_FLUSH_RETRY_DELAY = 30.0
+_pending_lifts: DefaultDict[int, List[dict]] = defaultdict(list)
+_lift_flush_timers: Dict[int, asyncio.Task] = {}
+_lift_channels: Dict[int, discord.abc.Messageable] = {}
+_lift_flush_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+def queue_lift(discord_id: int, row: dict, channel: discord.abc.Messageable) -> None:
+    _pending_lifts[discord_id].append(row)
+    _lift_channels[discord_id] = channel
+    if discord_id not in _lift_flush_timers:
+        _lift_flush_timers[discord_id] = asyncio.create_task(_flush_lifts_later(discord_id))
+
+async def flush_lifts(discord_id: int) -> None:
+    """Write the user's buffered lifts now; on failure they stay queued and a retry is scheduled.
+
+    Only one flush per user writes at a time: a flush that finds another in
+    flight waits for it, then writes whatever was queued meanwhile.
+    """
+    timer = _lift_flush_timers.pop(discord_id, None)
+    if timer is not None and timer is not asyncio.current_task():
+        timer.cancel()
+    async with _lock_for(_lift_flush_locks, discord_id):
+        rows = _pending_lifts.pop(discord_id, None)
+        if not rows:
+            return
+        try:
+            # The rows were queued against the session cached at /add_lift time.
+            # They're already acknowledged, so they go to whichever session is open
+            # now: if that one was ended (and maybe another started) from the
+            # dashboard, log_to_active_session re-reads it from the DB.
+            written = await log_to_active_session(discord_id, lambda session_id: add_weightlifts_db([
+                {**row, "session_id": session_id} for row in rows
+            ]))
+        except DatabaseError:
+            _pending_lifts[discord_id][:0] = rows
+            # Whoever failed (timer or an eager flush), keep a retry scheduled
+            if discord_id not in _lift_flush_timers:
+                _lift_flush_timers[discord_id] = asyncio.create_task(_flush_lifts_later(discord_id, retry=True))
+            raise
+        channel = _lift_channels.get(discord_id) if discord_id in _pending_lifts else _lift_channels.pop(discord_id, None)
+    if not written:
+        # No session is open any more; retrying can't help, so the rows are
+        # dropped and the user told.
+        log.warning("Dropped %d buffered lifts for %s: no active session", len(rows), discord_id)
+        if channel is not None:
+            try:
+                await channel.send(
+                    f"⚠️ <@{discord_id}> {len(rows)} buffered lift(s) weren't saved: "
+                    f"your session had already ended. Start a new one with `/session_start`."
+                )
+            except discord.HTTPException:
+                log.warning("Could not notify %s about the dropped lifts", discord_id)
+
+async def _flush_lifts_later(discord_id: int, retry: bool = False) -> None:
+    await asyncio.sleep(LIFT_FLUSH_RETRY_DELAY if retry else LIFT_FLUSH_DELAY)
+    try:
+        await flush_lifts(discord_id)
+    except DatabaseError as e:
+        log.error("Deferred lift flush failed for %s: %s", discord_id, e)
+        # Retries stay quiet: the first failure already told the user
+        channel = _lift_channels.get(discord_id)
+        if not retry and channel is not None:
+            try:
+                await channel.send(
+                    f"⚠️ <@{discord_id}> your last lifts couldn't be saved yet (database issue). "
+                    f"They're kept and I'll retry every {LIFT_FLUSH_RETRY_DELAY:.0f}s."
+                )
+            except discord.HTTPException:
+                log.warning("Could not notify %s about the failed lift flush", discord_id)
+
+
+async def log_to_active_session(discord_id: int, write: Callable[[int], Any]) -> Any:
+    """Run write(session_id) in a worker thread against the user's active session.
+
+    Returns write's result, or None if the user has no active session. A
+    falsy result means the (possibly cached) session had already ended; the
+    write helpers drop it from the cache then, so one re-read from the DB picks
+    up a session started elsewhere since.
+    """
+    for _ in range(2):
+        active = await asyncio.to_thread(get_active_session, discord_id)
+        if not active:
+            return None
+        result = await asyncio.to_thread(write, active.session_id)
+        if result:
+            return result
+    return None
+
+
 # ---------------------------
 # BOT COMMANDS
 # ---------------------------
 
-@bot.command()
-async def command(ctx):
-    """Display all available bot commands with examples"""
+def _build_command_list_embed() -> discord.Embed:
     embed = discord.Embed(
         title="🤖 Fitness Tracker Bot - Command List",
-        description="Here are all available commands:",
+        description=(
+            "Use these as `/` slash commands. The `!` prefix only works in DMs, "
+            "or in servers when the message starts by mentioning the bot."
+        ),
         color=discord.Color.purple()
     )
 
@@ -361,11 +944,11 @@ async def command(ctx):
         name="📋 Session Management",
         value=(
             "```"
-            "!session_start [notes]      Start a new gym session\n"
-            "!session_end                End active session (asks for calories)\n"
-            "!current                    View your active session\n"
-            "!session <id>               View specific session details\n"
-            "!today                      View all today's sessions"
+            "/session_start [notes]      Start a new gym session\n"
+            "/session_end [cal]          End active session (shows duration if cal omitted)\n"
+            "/current                    View your active session\n"
+            "/session <id>               View specific session details\n"
+            "/today                      View all today's sessions"
             "```"
         ),
         inline=False
@@ -374,8 +957,10 @@ async def command(ctx):
         name="💪 Exercise Logging",
         value=(
             "```"
-            "!add_cardio <machine> <mins> [km] [cal] [notes]\n"
-            "!add_lift <exercise> <muscle> <sets> <reps> <kg> [notes]"
+            "/add_cardio <machine> <mins> [km] [cal] [notes]\n"
+            "/add_cardio_bulk <machine,mins[,km,cal,notes]>; ...\n"
+            "/add_lift <exercise> <muscle> <sets> <reps> <kg> [notes]\n"
+            "/add_lifts_bulk <exercise,muscle,sets,reps,kg[,notes]>; ..."
             "```"
         ),
         inline=False
@@ -385,8 +970,8 @@ async def command(ctx):
         name="⚖️ Weight Tracking",
         value=(
             "```"
-            "!log_weight <weight_kg>     Log current body weight in KG\n"
-            "!view_progress              View last 10 weight logs"
+            "/log_weight <weight_kg>     Log current body weight in KG\n"
+            "/view_progress              View last 10 weight logs"
             "```"
         ),
         inline=False
@@ -395,86 +980,99 @@ async def command(ctx):
         name="📊 Reporting",
         value=(
             "```"
-            "!history                    View last 5 completed sessions\n"
-            "!pr                         View your Personal Records"
+            "/history                    View last 5 completed sessions\n"
+            "/pr                         View your Personal Records"
             "```"
         ),
         inline=False
     )
     embed.set_footer(text="💪 Track your gains! | Made for fitness enthusiasts")
-    await ctx.send(embed=embed)
+    return embed
+
+# Static help text: built once at import and shared (read-only) by every !command call
+COMMAND_LIST_EMBED = _build_command_list_embed()
+
+@bot.hybrid_command()
+async def command(ctx):
+    """Display all available bot commands with examples"""
+    await ctx.send(embed=COMMAND_LIST_EMBED)
 
 
-@bot.command()
+@bot.hybrid_command()
 async def session_start(ctx, *, notes: str = None):
-    try:
-        active = get_active_session(ctx.author.id)
-        if active:
-            await ctx.reply(f"⚠️ You already have an active session (ID: **{active[0]}**).")
-            return
-        session_id = start_session(ctx.author.id, str(ctx.author))
-        await ctx.reply(f"✅ **Gym session started for {ctx.author.name}!**\n📋 Session ID: **{session_id}**\n⏰ Start time: {datetime.now().strftime('%H:%M')}")
-    except DatabaseError as e:
-        await ctx.reply(f"❌ {e}")
-    except Exception:
-        await ctx.reply("❌ An unexpected error occurred starting the session.")
+    # Acknowledge slash invocations before any pooled DB work, so a slow
+    # database can't miss Discord's 3s interaction deadline. No-op for `!`.
+    await ctx.defer()
+    async with _lock_for(_user_locks, ctx.author.id):
+        try:
+            session_id = await asyncio.to_thread(start_session, ctx.author.id, str(ctx.author))
+            if session_id is None:
+                active = await asyncio.to_thread(get_active_session, ctx.author.id)
+                active_id = active.session_id if active else "?"
+                await ctx.reply(f"⚠️ You already have an active session (ID: **{active_id}**).")
+                return
+            # start_session just seeded the cache with the stored row, so this
+            # shows MySQL's start time without another round trip
+            active = await asyncio.to_thread(get_active_session, ctx.author.id)
+            started = str(active.start_time).rsplit(":", 1)[0] if active else "?"
+            await ctx.reply(f"✅ **Gym session started for {ctx.author.name}!**\n📋 Session ID: **{session_id}**\n⏰ Start time: {started}")
+        except DatabaseError as e:
+            await ctx.reply(f"❌ {e}")
+        except Exception:
+            await ctx.reply("❌ An unexpected error occurred starting the session.")
 
-@bot.command()
-async def session_end(ctx):
-    try:
-        active = get_active_session(ctx.author.id)
-        if not active:
-            await ctx.reply("❌ You don't have any active session. Start one with `!session_start`")
-            return
-        
-        session_id = active[0] 
-        start_val = active[2] 
-        
-        start_time_obj = None
-        if isinstance(start_val, timedelta):
-            start_time_obj = (datetime.min + start_val).time()
-        else:
-            try:
-                start_time_obj = datetime.strptime(str(start_val), "%H:%M:%S").time()
-            except ValueError:
-                await ctx.reply("❌ Error parsing start time.")
+@bot.hybrid_command()
+async def session_end(ctx, calories: int = None):
+    await ctx.defer()
+    async with _lock_for(_user_locks, ctx.author.id):
+        try:
+            # Read fresh rather than from active_session_cache: the duration
+            # must come from the same (DB) clock that stamped start_time.
+            active = await asyncio.to_thread(get_active_session_elapsed, ctx.author.id)
+            if not active:
+                await ctx.reply("❌ You don't have any active session. Start one with `/session_start`")
                 return
+        
+            session_id = active.session_id
+            duration = active.elapsed_mins
+            await flush_lifts(ctx.author.id)
 
-        start_dt = datetime.combine(date.today(), start_time_obj)
-        end_dt = datetime.now()
-        if end_dt < start_dt:
-            start_dt -= timedelta(days=1)
-            
-        duration = (end_dt - start_dt).seconds // 60
+            # Without the message_content intent a plain "350" reply arrives
+            # with empty content, so the calories come in as the command option
+            # instead of a follow-up message; without it, show the duration and
+            # leave the session open.
+            if calories is None:
+                await ctx.reply(
+                    f"📊 Session ID **{session_id}** found. Duration: **{duration} minutes**.\n"
+                    f"How many calories did you burn? 🔥 End it with `/session_end calories:<number>`."
+                )
+                return
 
-        await ctx.reply(f"📊 Session ID **{session_id}** found. Duration: **{duration} minutes**.\nHow many calories did you burn? 🔥")
-        
-        def check(msg):
-            return msg.author == ctx.author and msg.channel == ctx.channel and msg.content.isdigit()
-        
-        try:
-            msg = await bot.wait_for("message", check=check, timeout=60)
-            calories = int(msg.content)
-            end_session(session_id, calories)
+            ended = await asyncio.to_thread(end_session, session_id, calories, ctx.author.id)
+            if not ended:
+                await ctx.reply(f"⚠️ Session **{session_id}** was already ended.")
+                return
             await ctx.reply(f"✅ **Session ended!** 🔥 Total calories recorded: **{calories}**")
-        except Exception:
-            await ctx.reply("⏳ Timeout or error! Session remains active.")
 
-    except DatabaseError as e:
-        await ctx.reply(f"❌ {e}")
-    except Exception:
-        await ctx.reply("❌ An unexpected error occurred ending the session.")
+        except DatabaseError as e:
+            await ctx.reply(f"❌ {e}")
+        except Exception:
+            await ctx.reply("❌ An unexpected error occurred ending the session.")
 
 
-@bot.command()
+@bot.hybrid_command()
 async def add_cardio(ctx, machine: str, duration: int, distance: float = None, calories: int = None, *, notes: str = None):
+    await ctx.defer()
     try:
-        active = get_active_session(ctx.author.id)
-        if not active:
+        uid, author_name = ctx.author.id, str(ctx.author)
+        cardio_id = await log_to_active_session(
+            uid, lambda session_id: insert_cardio_db(
+                session_id, uid, author_name, machine, duration, distance, calories, notes
+            )
+        )
+        if cardio_id is None:
             await ctx.reply("❌ No active session found.")
             return
-        
-        insert_cardio_db(active[0], ctx.author.id, str(ctx.author), machine, duration, distance, calories, notes)
 
         # Display zero instead of None if you leave the calories section blank
         cal_display = calories if calories is not None else 0
@@ -488,20 +1086,83 @@ async def add_cardio(ctx, machine: str, duration: int, distance: float = None, c
     except DatabaseError as e:
         await ctx.reply(f"❌ {e}")
 
-@bot.command()
+def _parse_entries(entries: str, fields: str, converters: tuple, required: int) -> List[tuple]:
+    """Parse comma-separated entries (separated by newlines or ';') into tuples.
+
+    `converters` has one callable per field and `fields` names the first
+    `required` of them. Required fields must be non-blank; optional trailing
+    fields become None when blank. Raises commands.BadArgument naming the
+    offending entry, counting only the non-blank ones as the user sees them.
+    """
+    parsed = []
+    lines = [line.strip() for line in entries.replace(";", "\n").splitlines()]
+    for number, line in enumerate(filter(None, lines), start=1):
+        parts = [part.strip() for part in line.split(",", len(converters) - 1)]
+        if len(parts) < required:
+            raise commands.BadArgument(f"Entry {number} needs at least: {fields}.")
+        # Only the optional trailing fields may be left blank
+        for name, part in zip(fields.split(", "), parts[:required]):
+            if not part:
+                raise commands.BadArgument(f"Entry {number} is missing {name}.")
+        parts += [""] * (len(converters) - len(parts))
+        try:
+            parsed.append(tuple(convert(part) if part else None for convert, part in zip(converters, parts)))
+        except ValueError:
+            raise commands.BadArgument(f"Entry {number} has an invalid number: `{line}`")
+    return parsed
+
+def _parse_cardio_entries(entries: str) -> List[tuple]:
+    """Parse "machine,mins[,km,cal,notes]" entries; machine and mins must be non-blank."""
+    return _parse_entries(entries, "machine, mins", (str, int, float, int, str), required=2)
+
+def _parse_lift_entries(entries: str) -> List[tuple]:
+    """Parse "exercise,muscle,sets,reps,kg[,notes]" entries."""
+    return _parse_entries(entries, "exercise, muscle, sets, reps, kg", (str, str, int, int, int, str), required=5)
+
+@bot.hybrid_command()
+async def add_cardio_bulk(ctx, *, entries: str):
+    await ctx.defer()
+    try:
+        parsed = _parse_cardio_entries(entries)
+        if not parsed:
+            await ctx.reply("❌ No cardio entries found.")
+            return
+
+        # Resolved once rather than per row
+        uid, author_name = ctx.author.id, str(ctx.author)
+        # One executemany transaction for the whole batch
+        logged = await log_to_active_session(uid, lambda session_id: insert_cardios_db([
+            cardio_row(session_id, uid, author_name, machine, duration, distance, calories, notes)
+            for machine, duration, distance, calories, notes in parsed
+        ]))
+        if not logged:
+            await ctx.reply("❌ No active session found.")
+            return
+
+        lines = "\n".join([f"🏃 **{machine}** ({duration} min)" for machine, duration, *_ in parsed])
+        await ctx.reply(f"✅ **{logged} cardio entries logged!**\n{lines}")
+    except commands.BadArgument as e:
+        await ctx.reply(f"❌ {e}")
+    except DatabaseError as e:
+        await ctx.reply(f"❌ {e}")
+
+@bot.hybrid_command()
 async def add_lift(ctx, exercise: str, muscle: str, sets: int, reps: int, weight: int, *, notes: str = None):
+    await ctx.defer()
     try:
-        active = get_active_session(ctx.author.id)
+        active = await asyncio.to_thread(get_active_session, ctx.author.id)
         if not active:
             await ctx.reply("❌ No active session found.")
             return
         
-        lift_id = add_weightlift_db(
-            active[0], ctx.author.id, str(ctx.author), exercise, muscle, sets, reps, weight, notes
+        queue_lift(
+            ctx.author.id,
+            lift_row(active.session_id, ctx.author.id, str(ctx.author), exercise, muscle, sets, reps, weight, notes),
+            ctx.channel,
         )
         
         await ctx.reply(
-                    f"✅ **Lift logged!** (ID: `{lift_id}`)\n"
+                    f"✅ **Lift logged!**\n"
                     f"💪 Exercise: **{exercise}**\n"
                     f"🎯 Muscle: **{muscle}**\n"
                     f"📊 **{sets}**×**{reps}** @ **{weight}kg**"
@@ -509,130 +1170,204 @@ async def add_lift(ctx, exercise: str, muscle: str, sets: int, reps: int, weight
     except DatabaseError as e:
         await ctx.reply(f"❌ {e}")
 
-@bot.command()
+def _build_session_embed(details: dict, title: str) -> discord.Embed:
+    """Embed for a get_*session_details() result, shared by !current and !session."""
+    session = details["session"]
+    active = session["end_time"] is None
+    embed = discord.Embed(title=title, color=discord.Color.green() if active else discord.Color.blurple())
+
+    info = f"**Date:** {session['date']}\n**Start:** {session['start_time']}"
+    if not active:
+        info += f"\n**End:** {session['end_time']}\n**Calories:** {session['total_calories'] or 0}"
+    embed.add_field(name="📅 Info", value=info, inline=False)
+
+    if details["cardio"]:
+        cardio_text = "\n".join([f"• **{log['machine_type']}** ({log['duration_minutes']}min)" for log in details["cardio"]])
+        embed.add_field(name="🏃 Cardio", value=cardio_text, inline=False)
+
+    if details["lifts"]:
+        lift_text = "\n".join([f"• **{log['exercise_name']}**: {log['sets']}×{log['reps']} @ {log['weight']}kg" for log in details["lifts"]])
+        embed.add_field(name="💪 Weightlifting", value=lift_text, inline=False)
+
+    if not details["cardio"] and not details["lifts"]:
+        embed.add_field(name="📭 Logs", value="No exercises logged.", inline=False)
+
+    return embed
+
+@bot.hybrid_command()
+async def add_lifts_bulk(ctx, *, entries: str):
+    await ctx.defer()
+    try:
+        parsed = _parse_lift_entries(entries)
+        if not parsed:
+            await ctx.reply("❌ No lift entries found.")
+            return
+
+        # Written straight away in one executemany, bypassing the !add_lift buffer
+        uid, author_name = ctx.author.id, str(ctx.author)
+        logged = await log_to_active_session(uid, lambda session_id: add_weightlifts_db([
+            lift_row(session_id, uid, author_name, exercise, muscle, sets, reps, weight, notes)
+            for exercise, muscle, sets, reps, weight, notes in parsed
+        ]))
+        if not logged:
+            await ctx.reply("❌ No active session found.")
+            return
+
+        lines = "\n".join([f"💪 **{exercise}**: {sets}×{reps} @ {weight}kg" for exercise, _, sets, reps, weight, _ in parsed])
+        await ctx.reply(f"✅ **{logged} lifts logged!**\n{lines}")
+    except commands.BadArgument as e:
+        await ctx.reply(f"❌ {e}")
+    except DatabaseError as e:
+        await ctx.reply(f"❌ {e}")
+
+@bot.hybrid_command()
 async def current(ctx):
+    await ctx.defer()
     try:
-        active = get_active_session(ctx.author.id)
-        if not active:
+        await flush_lifts(ctx.author.id)
+        details = await asyncio.to_thread(get_active_session_details, ctx.author.id)
+        if not details:
             await ctx.reply("📅 No active session found.")
             return
-        details = get_session_details(active[0])
-        session = details["session"]
-        embed = discord.Embed(title=f"🏋️ Current Session #{session[0]}", color=discord.Color.green())
-        embed.add_field(name="📅 Info", value=f"**Date:** {session[1]}\n**Start:** {session[2]}", inline=False)
-        
-        if details["cardio"]:
-            cardio_text = "\n".join([f"• **{log[0]}** ({log[1]}min)" for log in details["cardio"]])
-            embed.add_field(name="🏃 Cardio", value=cardio_text, inline=False)
-        
-        if details["lifts"]:
-            lift_text = "\n".join([f"• **{log[0]}**: {log[2]}×{log[3]} @ {log[4]}kg" for log in details["lifts"]])
-            embed.add_field(name="💪 Weightlifting", value=lift_text, inline=False)
-        
+        embed = _build_session_embed(details, f"🏋️ Current Session #{details['session']['session_id']}")
         await ctx.send(embed=embed)
     except DatabaseError as e:
         await ctx.reply(f"❌ {e}")
 
-@bot.command()
+@bot.hybrid_command()
+async def session(ctx, session_id: int):
+    await ctx.defer()
+    try:
+        await flush_lifts(ctx.author.id)
+        details = await asyncio.to_thread(get_session_details, session_id, ctx.author.id)
+        if not details:
+            await ctx.reply(f"❌ Session **{session_id}** not found.")
+            return
+        embed = _build_session_embed(details, f"🏋️ Session #{session_id}")
+        await ctx.send(embed=embed)
+    except DatabaseError as e:
+        await ctx.reply(f"❌ {e}")
+
+@bot.hybrid_command()
+async def today(ctx):
+    await ctx.defer()
+    try:
+        await flush_lifts(ctx.author.id)
+        sessions = await asyncio.to_thread(get_todays_sessions, ctx.author.id)
+        if not sessions:
+            await ctx.reply("📅 No sessions today yet. Start one with `/session_start`")
+            return
+
+        embed = discord.Embed(title="📅 Today's Sessions", color=discord.Color.blue())
+        for s in sessions:
+            if s.end_time is None:
+                value = f"**Start:** {s.start_time}\n🟢 Active"
+            else:
+                value = (
+                    f"**Start:** {s.start_time} | **End:** {s.end_time}\n"
+                    f"⏱️ {s.duration_mins} min | 🔥 {s.total_calories or 0} cal"
+                )
+            embed.add_field(name=f"Session #{s.session_id}", value=value, inline=False)
+        await ctx.send(embed=embed)
+    except DatabaseError as e:
+        await ctx.reply(f"❌ {e}")
+
+@bot.hybrid_command()
 async def history(ctx):
+    await ctx.defer()
     try:
-        with engine.connect() as conn:
-            # We fetch the raw data from the gym_sessions table
-            sessions = conn.execute(
-                text("""
-                    SELECT session_id, date, start_time, end_time, total_calories
-                    FROM gym_sessions
-                    WHERE discord_id = :uid AND end_time IS NOT NULL
-                    ORDER BY session_id DESC
-                    LIMIT 5
-                """), {"uid": ctx.author.id}
-            ).fetchall()
+        await flush_lifts(ctx.author.id)
+        sessions = await asyncio.to_thread(get_history, ctx.author.id, 5)
 
         if not sessions:
             await ctx.reply("📭 No completed sessions found.")
             return
 
         headers = ["ID", "Date", "Dur(m)", "Cals"]
-        rows = []
-        
-        for s in sessions:
-            session_id, s_date, s_start, s_end, s_cals = s
-            
-            # --- DURATION CALCULATION ---
-            # Convert timedelta/string to a usable format to calculate minutes
-            try:
-                # Combining with a dummy date to subtract times safely
-                start_dt = datetime.combine(date.today(), (datetime.min + s_start).time())
-                end_dt = datetime.combine(date.today(), (datetime.min + s_end).time())
-                
-                # If the session crossed midnight
-                if end_dt < start_dt:
-                    end_dt += timedelta(days=1)
-                
-                duration_mins = (end_dt - start_dt).seconds // 60
-            except:
-                duration_mins = "???" # Fallback if data is corrupted
-
-            # Append the actual calculated duration instead of "-"
-            rows.append([
-                f"#{session_id}", 
-                s_date.strftime("%b %d"), 
-                f"{duration_mins}", 
+        rows = [
+            [
+                f"#{session_id}",
+                s_date.strftime("%b %d"),
+                duration_mins if duration_mins is not None else "???",
                 s_cals if s_cals is not None else "0"
-            ])
+            ]
+            for session_id, s_date, duration_mins, s_cals in sessions
+        ]
         
         table = create_table(headers, rows)
         embed = discord.Embed(title="📜 Workout History", color=discord.Color.dark_theme())
         embed.description = f"```text\n{table}\n```"
         await ctx.send(embed=embed)
     except Exception as e:
-        print(f"History Error: {e}")
+        log.exception("History Error: %s", e)
         await ctx.reply(f"❌ Error generating history: {e}")
 
-@bot.command()
+PR_ROWS_PER_PAGE = 40
+
+@bot.hybrid_command()
 async def pr(ctx):
+    await ctx.defer()
     try:
-        records = get_personal_records(ctx.author.id)
+        await flush_lifts(ctx.author.id)
+        records = await asyncio.to_thread(get_personal_records, ctx.author.id)
         if not records:
             await ctx.reply("🏅 No records found yet!")
             return
 
         headers = ["Exercise", "Max (kg)", "Date"]
-        rows = [[r[0][:15], r[1], r[2].strftime("%b %d") if r[2] else "-"] for r in records]
-        table = create_table(headers, rows)
-        
-        # Create the embed
-        embed = discord.Embed(title="🏆 Personal Records", color=discord.Color.gold())
-        
-        # Add "User A's personal record" at the very top of the description
-        # We use ctx.author.display_name to get their current nickname or username
-        user_text = f"**This is {ctx.author.display_name}'s personal records**\n"
-        embed.description = f"{user_text}```text\n{table}\n```"
-        
-        # Optional: Add their avatar icon next to the title for a cleaner look
-        embed.set_author(name=ctx.author.display_name, icon_url=ctx.author.display_avatar.url)
+        rows = [
+            [r.exercise_name[:15], r.max_weight, r.pr_date.strftime("%b %d") if r.pr_date else "-"]
+            for r in records
+        ]
+        # Long PR lists are split so each table stays well under Discord's
+        # 4096-char embed description limit
+        pages = [rows[i:i + PR_ROWS_PER_PAGE] for i in range(0, len(rows), PR_ROWS_PER_PAGE)]
+        for page_number, page_rows in enumerate(pages, start=1):
+            table = create_table(headers, page_rows)
 
-        await ctx.send(embed=embed)
+            # Create the embed
+            title = "🏆 Personal Records"
+            if len(pages) > 1:
+                title += f" ({page_number}/{len(pages)})"
+            embed = discord.Embed(title=title, color=discord.Color.gold())
+
+            # Add "User A's personal record" at the very top of the description
+            # We use ctx.author.display_name to get their current nickname or username
+            user_text = f"**This is {ctx.author.display_name}'s personal records**\n" if page_number == 1 else ""
+            embed.description = f"{user_text}```text\n{table}\n```"
+
+            # Optional: Add their avatar icon next to the title for a cleaner look
+            embed.set_author(name=ctx.author.display_name, icon_url=ctx.author.display_avatar.url)
+
+            await ctx.send(embed=embed)
     except DatabaseError as e:
         await ctx.reply(f"❌ {e}")
 
-@bot.command()
+@bot.hybrid_command()
 async def log_weight(ctx, weight: float):
+    # Checked after rounding: weight_kg is DECIMAL(5,2), and e.g. 999.996
+    # would round up to 1000.00 and overflow it
+    weight = round(weight, 2)
+    if not 0 < weight <= 999.99:
+        await ctx.reply("❌ Weight must be between 0.01 and 999.99 KG.")
+        return
+    await ctx.defer()
     try:
-        log_id = log_weight_db(ctx.author.id, weight)
+        log_id = await asyncio.to_thread(log_weight_db, ctx.author.id, weight)
         await ctx.reply(f"✅ **Weight logged!** ⚖️ **{weight} KG** recorded.")
     except DatabaseError as e:
         await ctx.reply(f"❌ {e}")
 
-@bot.command()
+@bot.hybrid_command()
 async def view_progress(ctx):
+    await ctx.defer()
     try:
-        history = get_weight_history(ctx.author.id)
+        history = await asyncio.to_thread(get_weight_history, ctx.author.id)
         if not history:
             await ctx.reply("📈 No logs found.")
             return
         headers = ["Date", "KG"]
-        rows = [[entry[0].strftime("%b %d"), str(entry[1])] for entry in history]
+        rows = [[entry.date_checked.strftime("%b %d"), f"{entry.weight_kg:.1f}"] for entry in history]
         table = create_table(headers, rows)
         embed = discord.Embed(title="📊 Weight Progress", color=discord.Color.teal())
         embed.description = f"```text\n{table}\n```"
@@ -644,7 +1379,19 @@ async def view_progress(ctx):
 # RUN BOT
 # ---------------------------
 if __name__ == "__main__":
-    bot.run(DISCORD_TOKEN)
+    log_listener = _setup_logging()
+    # log_handler=None: discord.py logs through the queued root handler too
+    try:
+        bot.run(DISCORD_TOKEN, log_handler=None)
+        # Lifts still buffered at shutdown (their timers died with the loop);
+        # one user's failed write must not drop everyone else's.
+        for discord_id, rows in _pending_lifts.items():
+            try:
+                add_weightlifts_db(rows)
+            except DatabaseError:
+                log.exception("Shutdown lift flush failed for %s (%d rows lost)", discord_id, len(rows))
+    finally:
+        log_listener.stop()  # drains queued records before exit
 
 
 
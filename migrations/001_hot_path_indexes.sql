@@ -0,0 +1,23 @@
+-- Composite indexes backing the bot's hot queries (MySQL 8.0+).
+-- Run once against the bot database, and check each query below with
+-- EXPLAIN.
+
+-- get_active_session / get_active_session_details:
+--   WHERE discord_id = ? AND end_time IS NULL ORDER BY session_id DESC LIMIT 1
+-- (end_time IS NULL is an equality here, so rows come back in session_id
+-- order.) get_history's end_time IS NOT NULL is a range on this index and
+-- still sorts; it has its own index in 011.
+CREATE INDEX idx_sessions_user_end ON gym_sessions (discord_id, end_time, session_id DESC);
+
+-- get_session_details / get_active_session_details log lookups:
+--   WHERE session_id = ?
+CREATE INDEX idx_cardio_session ON cardio_logs (session_id);
+CREATE INDEX idx_lift_session ON weightlift_logs (session_id);
+
+-- get_personal_records:
+--   WHERE discord_id = ? ... PARTITION BY exercise_name ORDER BY weight DESC, date DESC
+CREATE INDEX idx_lift_user_pr ON weightlift_logs (discord_id, exercise_name, weight DESC, date DESC);
+
+-- get_weight_history:
+--   WHERE discord_id = ? ORDER BY date_checked DESC LIMIT 10
+CREATE INDEX idx_weight_user_date ON weight_check (discord_id, date_checked DESC);
@@ -0,0 +1,16 @@
+-- One weight entry per user per day: log_weight_db upserts on this key.
+--
+-- If weight_check already holds several rows for the same user and day,
+-- remove the older ones first, e.g. (adjust `id` to the table's
+-- auto-increment key):
+--   DELETE older FROM weight_check older
+--   JOIN weight_check newer
+--     ON newer.discord_id = older.discord_id
+--    AND newer.date_checked = older.date_checked
+--    AND newer.id > older.id;
+ALTER TABLE weight_check ADD UNIQUE KEY uq_weight_user_date (discord_id, date_checked);
+
+-- The unique key also serves get_weight_history's
+-- ORDER BY date_checked DESC (backward index scan), so the index from
+-- 001_hot_path_indexes.sql is redundant.
+DROP INDEX idx_weight_user_date ON weight_check;
@@ -0,0 +1,8 @@
+-- Per-day session lookups (MySQL 8.0+). Run once after 001 and 002.
+--
+-- The !today summary listed in the help embed reads one user's sessions
+-- for a calendar day:
+--   WHERE discord_id = ? AND date = CURDATE() ORDER BY session_id DESC
+-- idx_sessions_user_end from 001 leads with end_time and cannot serve a
+-- date filter, so give it its own composite index.
+CREATE INDEX idx_sessions_user_date ON gym_sessions (discord_id, date, session_id DESC);
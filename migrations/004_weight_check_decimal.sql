@@ -0,0 +1,7 @@
+-- Store body weight with two decimals (e.g. 72.35 kg) instead of a lossy
+-- integer/float column. DECIMAL(5,2) covers 0.00–999.99; log_weight_db
+-- rounds to two places before binding.
+--
+-- Check the current definition first (SHOW CREATE TABLE weight_check) and
+-- keep its NULL/NOT NULL setting if it differs from the one below.
+ALTER TABLE weight_check MODIFY COLUMN weight_kg DECIMAL(5,2) NOT NULL;
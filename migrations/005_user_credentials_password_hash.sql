@@ -0,0 +1,8 @@
+-- Store a SHA-256 hex digest of each dashboard password so logins look the
+-- row up by username and compare hashes (authenticate_user), instead of
+-- matching the plaintext password in SQL.
+--
+-- The plaintext column is left in place so nothing that still writes it
+-- breaks; drop it once every writer sets password_hash.
+ALTER TABLE user_credentials ADD COLUMN password_hash CHAR(64) NULL;
+UPDATE user_credentials SET password_hash = SHA2(password, 256) WHERE password_hash IS NULL;
@@ -0,0 +1,10 @@
+-- Let MySQL derive food_intake.calories from the macros (4/4/9 kcal per gram)
+-- so stored totals can never drift from protein/carbs/fats; log_food_intake_db
+-- no longer computes or sends it.
+--
+-- Check the current definition first (SHOW CREATE TABLE food_intake) and keep
+-- its type if it differs from the one below. A regular column can only be
+-- converted to a STORED (not VIRTUAL) generated column.
+ALTER TABLE food_intake
+    MODIFY COLUMN calories DECIMAL(8,2)
+    GENERATED ALWAYS AS (protein_g * 4 + carbs_g * 4 + fats_g * 9) STORED;
@@ -0,0 +1,11 @@
+-- Dashboard login lookup (MySQL 8.0+). Run once after 005.
+--
+-- authenticate_user now finds the credentials row by username alone:
+--   WHERE username = ?
+-- A unique key turns that into a single index seek and guarantees the
+-- lookup can never match two accounts.
+--
+-- If user_credentials already holds duplicate usernames, resolve them
+-- first:
+--   SELECT username, COUNT(*) FROM user_credentials GROUP BY username HAVING COUNT(*) > 1;
+ALTER TABLE user_credentials ADD UNIQUE KEY uq_user_credentials_username (username);
@@ -0,0 +1,8 @@
+-- Room for bcrypt hashes in user_credentials.password_hash. Run once after 005.
+--
+-- bcrypt cannot be computed in SQL, so existing SHA-256 digests from 005 stay
+-- valid: authenticate_user still accepts them and rewrites the row with a
+-- bcrypt hash on the user's next successful login. Once every password_hash
+-- starts with "$2", the plaintext password column can be dropped:
+--   ALTER TABLE user_credentials DROP COLUMN password;
+ALTER TABLE user_credentials MODIFY COLUMN password_hash VARCHAR(255) NULL;
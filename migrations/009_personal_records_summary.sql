@@ -0,0 +1,46 @@
+-- Trigger-maintained PR summary (MySQL 8.0+). Run once after 001.
+--
+-- get_personal_records used to rank every one of a user's weightlift_logs
+-- rows with ROW_NUMBER() on each cache miss. It now reads one row per
+-- exercise from personal_records, which an AFTER INSERT trigger keeps
+-- current. Lifts are never updated or deleted by the bot or dashboard; if
+-- rows are ever removed by hand, re-run the backfill below for that user.
+--
+-- Check the column types first (SHOW CREATE TABLE weightlift_logs) and
+-- match exercise_name / weight if they differ from the ones below.
+CREATE TABLE personal_records (
+    discord_id    BIGINT       NOT NULL,
+    exercise_name VARCHAR(100) NOT NULL,
+    max_weight    INT          NOT NULL,
+    pr_date       DATE         NOT NULL,
+    PRIMARY KEY (discord_id, exercise_name)
+);
+
+-- Backfill: heaviest lift per exercise, latest date on ties (the same
+-- ranking the old query used).
+INSERT INTO personal_records (discord_id, exercise_name, max_weight, pr_date)
+SELECT discord_id, exercise_name, weight, date
+FROM (
+    SELECT discord_id, exercise_name, weight, date,
+           ROW_NUMBER() OVER (
+               PARTITION BY discord_id, exercise_name
+               ORDER BY weight DESC, date DESC
+           ) AS rn
+    FROM weightlift_logs
+) ranked
+WHERE rn = 1;
+
+-- pr_date is assigned before max_weight, so it still compares against the
+-- old record.
+CREATE TRIGGER trg_weightlift_logs_pr AFTER INSERT ON weightlift_logs
+FOR EACH ROW
+    INSERT INTO personal_records (discord_id, exercise_name, max_weight, pr_date)
+    VALUES (NEW.discord_id, NEW.exercise_name, NEW.weight, NEW.date)
+    ON DUPLICATE KEY UPDATE
+        pr_date = IF(VALUES(max_weight) > max_weight
+                     OR (VALUES(max_weight) = max_weight AND VALUES(pr_date) > pr_date),
+                     VALUES(pr_date), pr_date),
+        max_weight = GREATEST(max_weight, VALUES(max_weight));
+
+-- idx_lift_user_pr from 001 only served the old ranking query.
+DROP INDEX idx_lift_user_pr ON weightlift_logs;
@@ -0,0 +1,8 @@
+-- Per-user secret mixed into the dashboard's ?tok= login token signature.
+-- Run once after 008.
+--
+-- Logging out writes a fresh value, which revokes every token issued to that
+-- user (on all devices); it is filled in on first token issue, so existing
+-- rows can stay NULL. Tokens are also bound to password_hash, so a password
+-- change revokes them without touching this column.
+ALTER TABLE user_credentials ADD COLUMN token_secret CHAR(32) NULL;
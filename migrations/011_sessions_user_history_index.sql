@@ -0,0 +1,16 @@
+-- Completed-session history without a filesort (MySQL 8.0+). Run once after 001.
+--
+-- get_history (!history, dashboard Home/History) reads:
+--   WHERE discord_id = ? AND end_time IS NOT NULL ORDER BY session_id DESC LIMIT n
+-- On idx_sessions_user_end (discord_id, end_time, session_id DESC) from 001,
+-- end_time IS NOT NULL is a range over end_time values, so the rows come back
+-- in end_time order and ORDER BY session_id still needs a filesort. This index
+-- is in session_id order per user; end_time is filtered from the index entry
+-- itself (index condition pushdown), and since almost every session is ended
+-- the backward scan stops after about n entries.
+--
+-- Check after creating it; the plan should show key idx_sessions_user_history
+-- and no "Using filesort" in Extra:
+--   EXPLAIN SELECT session_id FROM gym_sessions
+--   WHERE discord_id = 1 AND end_time IS NOT NULL ORDER BY session_id DESC LIMIT 5;
+CREATE INDEX idx_sessions_user_history ON gym_sessions (discord_id, session_id DESC, end_time);
@@ -2,55 +2,170 @@ import streamlit as st
 
 st.set_page_config(page_title="Fitness Tracker 💪", page_icon="🏋️", layout="wide", initial_sidebar_state="expanded")
 
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from collections import namedtuple
+import bcrypt
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, date
 from sqlalchemy import text
 
+# The dashboard has no keepalive task and can idle past the server's timeout,
+# and a checkout ping is negligible at human click rates; read when gymbros
+# builds its engine, so it must be set before the import.
+os.environ.setdefault("DB_POOL_PRE_PING", "1")
+
 try:
     from gymbros import (engine, DatabaseError, start_session, get_active_session, end_session,
-                         insert_cardio_db, add_weightlift_db, get_personal_records, log_weight_db, get_weight_history)
+                         insert_cardio_db, add_weightlift_db, get_personal_records, log_weight_db, get_weight_history,
+                         get_history, get_calories_by_day, lift_row, add_weightlifts_db, forget_cached_reads)
 except ImportError as e:
     st.error(f"❌ Cannot import from gymbros.py: {e}")
     st.stop()
 
+# SQL used only by the dashboard; bot-shared statements live in gymbros.py
+_SQL_AUTHENTICATE = text("""SELECT discord_id, username, password_hash, token_secret
+                            FROM user_credentials WHERE username = :u""")
+_SQL_SET_PASSWORD_HASH = text("UPDATE user_credentials SET password_hash = :h WHERE username = :u")
+_SQL_SET_TOKEN_SECRET = text("UPDATE user_credentials SET token_secret = :s WHERE username = :u")
+_SQL_LOG_FOOD = text("""INSERT INTO food_intake (discord_id, date, meal_name, protein_g, carbs_g, fats_g)
+                        VALUES (:uid, :date, :meal, :prot, :carb, :fat)""")
+
 # Authentication
+# Checked against unknown usernames too, so they cost the same bcrypt work as
+# a wrong password. Cached: the script body reruns on every interaction.
+@st.cache_resource
+def _dummy_hash() -> bytes:
+    return bcrypt.hashpw(b"", bcrypt.gensalt())
+
+def _check_password(password: str, stored: str) -> bool:
+    if stored.startswith("$2"):
+        return bcrypt.checkpw(password.encode(), stored.encode())
+    # Unsalted SHA-256 digests backfilled by migration 005; upgraded on login.
+    return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+
+LoginUser = namedtuple("LoginUser", "discord_id username password_hash token_secret")
+
 def authenticate_user(username: str, password: str):
     try:
         with engine.connect() as conn:
-            result = conn.execute(text("SELECT discord_id, username FROM user_credentials WHERE username = :u AND password = :p"),
-                                {"u": username, "p": password}).fetchone()
-            return result
+            result = conn.execute(_SQL_AUTHENTICATE, {"u": username}).fetchone()
+        if result is None or not result.password_hash:
+            bcrypt.checkpw(password.encode(), _dummy_hash())
+            return None
+        if not _check_password(password, result.password_hash):
+            return None
+        user = LoginUser(*result)
+        if not user.password_hash.startswith("$2"):
+            user = user._replace(password_hash=bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode())
+            with engine.begin() as conn:
+                conn.execute(_SQL_SET_PASSWORD_HASH, {"u": username, "h": user.password_hash})
+        return user
     except Exception as e:
         st.error(f"Auth error: {e}")
         return None
 
-# Helper functions
-def get_history(discord_id: int, limit: int = 5):
+# Signed login token kept in the URL (?tok=...), so a page refresh restores the
+# session without the password and bcrypt check. Disabled unless
+# DASHBOARD_SECRET is set; tokens expire after DASHBOARD_TOKEN_TTL seconds.
+# The signature also covers the user's current password_hash and token_secret
+# (migration 010), so a password change or a logout, which rotates
+# token_secret, revokes every token issued before it.
+_TOKEN_SECRET = os.getenv("DASHBOARD_SECRET", "").encode()
+_TOKEN_TTL = int(os.getenv("DASHBOARD_TOKEN_TTL", str(12 * 3600)))
+
+def _sign(payload: str, user: LoginUser) -> str:
+    message = f"{payload}|{user.token_secret}|{user.password_hash}".encode()
+    return hmac.new(_TOKEN_SECRET, message, hashlib.sha256).hexdigest()
+
+def _rotate_token_secret(username: str) -> str:
+    token_secret = secrets.token_hex(16)
+    with engine.begin() as conn:
+        conn.execute(_SQL_SET_TOKEN_SECRET, {"u": username, "s": token_secret})
+    return token_secret
+
+def make_login_token(user: LoginUser) -> str:
+    if not user.token_secret:
+        user = user._replace(token_secret=_rotate_token_secret(user.username))
+    payload = base64.urlsafe_b64encode(
+        json.dumps([user.discord_id, user.username, int(time.time()) + _TOKEN_TTL]).encode()).decode()
+    return f"{payload}.{_sign(payload, user)}"
+
+def read_login_token(token: str):
+    """Return (discord_id, username) for a valid, unexpired, unrevoked token, else None."""
+    payload, _, sig = token.rpartition(".")
     try:
+        discord_id, username, expires = json.loads(base64.urlsafe_b64decode(payload))
+        if not isinstance(username, str) or not expires > time.time():
+            return None
         with engine.connect() as conn:
-            return conn.execute(text("""SELECT session_id, date, start_time, end_time, total_calories 
-                                       FROM gym_sessions WHERE discord_id = :uid AND end_time IS NOT NULL 
-                                       ORDER BY session_id DESC LIMIT :limit"""), 
-                              {"uid": discord_id, "limit": limit}).fetchall()
+            result = conn.execute(_SQL_AUTHENTICATE, {"u": username}).fetchone()
+    except (ValueError, TypeError):
+        return None
     except Exception as e:
-        raise DatabaseError(f"Could not retrieve history: {e}")
+        st.error(f"Auth error: {e}")
+        return None
+    if result is None or not result.token_secret or result.discord_id != discord_id:
+        return None
+    if not hmac.compare_digest(sig, _sign(payload, LoginUser(*result))):
+        return None
+    return discord_id, username
 
+def revoke_login_tokens(username: str) -> None:
+    try:
+        _rotate_token_secret(username)
+    except Exception as e:
+        st.error(f"Logout error: {e}")
+
+# Helper functions
 def log_food_intake_db(discord_id, entry_date, meal_name, protein, carbs, fats):
     try:
-        calories = (protein * 4) + (carbs * 4) + (fats * 9)
-        with engine.connect() as conn:
-            conn.execute(text("""INSERT INTO food_intake (discord_id, date, meal_name, calories, protein_g, carbs_g, fats_g)
-                                VALUES (:uid, :date, :meal, :cal, :prot, :carb, :fat)"""),
+        # calories is a generated column (migration 006)
+        with engine.begin() as conn:
+            conn.execute(_SQL_LOG_FOOD,
                        {"uid": discord_id, "date": entry_date, "meal": meal_name, 
-                        "cal": calories, "prot": protein, "carb": carbs, "fat": fats})
-            conn.commit()
+                        "prot": protein, "carb": carbs, "fat": fats})
         return True
     except Exception as e:
         st.error(f"Error: {e}")
         return False
 
+# Completed sessions only change when a session ends, so reruns (every widget
+# interaction) reuse the frame. PRs, weight history and the active session are
+# already cached inside gymbros and invalidated by its write helpers; writes
+# made from Discord show up here once those entries' 60s TTL runs out.
+HISTORY_COLUMNS = ["ID", "Date", "Duration (min)", "Calories"]
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_history(discord_id: int, limit: int) -> pd.DataFrame:
+    return pd.DataFrame(get_history(discord_id, limit), columns=HISTORY_COLUMNS)
+
+# Daily totals aggregated in SQL, so the chart stays one bar per day however
+# many sessions a user logs. SUM() and DECIMAL columns arrive as Decimal, so the
+# plotted frames are cast to real dtypes (not object columns) before Plotly.
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_calories_by_day(discord_id: int, days: int = 90) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(get_calories_by_day(discord_id, days), columns=["Date", "Calories"])
+    return df.astype({"Date": "datetime64[ns]", "Calories": "float64"})
+
+# Keyed on the rows themselves (at most 10, already cached by gymbros), so the
+# figure is only rebuilt when a new weight log changes them.
+@st.cache_data(ttl=300, show_spinner=False)
+def weight_figure(rows: tuple):
+    df = (pd.DataFrame.from_records(rows, columns=["Date", "Weight (kg)"])
+          .astype({"Date": "datetime64[ns]", "Weight (kg)": "float64"})
+          .sort_values("Date"))
+    fig = go.Figure(go.Scatter(x=df["Date"].to_numpy(), y=df["Weight (kg)"].to_numpy(),
+                               mode="lines+markers", line_color='#00C9FF'))
+    fig.update_layout(title="Weight Trend", xaxis_title="Date", yaxis_title="Weight (kg)")
+    return fig
+
 # Exercise database
 MUSCLE_GROUPS = {
     "💪 Chest": ["Bench Press", "Incline Bench Press", "Dumbbell Flyes", "Cable Flyes", "Push-Ups"],
@@ -64,23 +179,142 @@ MUSCLE_GROUPS = {
 
 CARDIO_MACHINES = ["🏃 Treadmill", "🚴 Bike", "🚣 Rowing", "🎿 Elliptical", "🪜 Stair Climber", "🏊 Swimming"]
 
-# Compact CSS
-st.markdown("""<style>
+# Display label -> name stored in the DB ("💪 Chest" -> "Chest")
+MUSCLE_NAMES = {label: label.split(" ", 1)[1] for label in MUSCLE_GROUPS}
+CARDIO_NAMES = {label: label.split(" ", 1)[1] for label in CARDIO_MACHINES}
+MUSCLE_KEYS = tuple(MUSCLE_GROUPS)
+
+# Compact CSS. Emitted on every rerun on purpose: Streamlit drops any element a
+# rerun doesn't re-emit, so a run-once guard would strip the styling after the
+# first interaction. An unchanged element is diffed away by the frontend.
+_CSS = """<style>
 div[data-testid="stForm"] p {display: none !important;}
 .stButton>button {width: 100%; background: linear-gradient(90deg, #00C9FF, #92FE9D); color: white; 
                   font-weight: bold; border-radius: 10px; padding: 12px; font-size: 16px;}
 .success-box {padding: 15px; border-radius: 10px; background: linear-gradient(135deg, #667eea, #764ba2);
               color: white; text-align: center; margin: 10px 0;}
 @media (max-width: 768px) {[data-testid="column"] {width: 100% !important;}}
-</style>""", unsafe_allow_html=True)
+</style>"""
+st.markdown(_CSS, unsafe_allow_html=True)
 
 PLOT_CONFIG = {'scrollZoom': False, 'displayModeBar': False}
 
+# Logging forms run as fragments: editing sets/reps/weight only reruns the form,
+# not the whole script (and the DB reads of every other tab).
+@st.fragment
+def lift_form(session_id: int, user_id: int, username: str):
+    muscle_group = st.selectbox("Muscle:", MUSCLE_KEYS)
+    exercise = st.selectbox("Exercise:", MUSCLE_GROUPS[muscle_group])
+    per_set = st.toggle("Log individual sets")
+    if per_set:
+        set_table = st.data_editor(pd.DataFrame({"Reps": [10, 10, 10], "Weight (kg)": [20, 20, 20]}),
+                                   num_rows="dynamic", use_container_width=True, hide_index=True, key="lift_sets")
+    else:
+        c1, c2, c3 = st.columns(3)
+        with c1: sets = st.number_input("Sets", 1, value=3)
+        with c2: reps = st.number_input("Reps", 1, value=10)
+        with c3: weight = st.number_input("Weight (kg)", 0, value=20)
+    notes = st.text_area("Notes", max_chars=200)
+    
+    if st.button("✅ Log Lift", use_container_width=True):
+        try:
+            if per_set:
+                # Every set is its own row, written together in one executemany
+                rows = [lift_row(session_id, user_id, username, exercise, MUSCLE_NAMES[muscle_group],
+                                 1, int(r), int(w), notes)
+                        for r, w in set_table.dropna().itertuples(index=False)]
+                if not rows:
+                    st.warning("⚠️ Add at least one set.")
+                    return
+                logged = add_weightlifts_db(rows)
+                summary = ", ".join([f"{row['reps']}@{row['weight']}kg" for row in rows])
+            else:
+                logged = add_weightlift_db(session_id, user_id, username,
+                                exercise, MUSCLE_NAMES[muscle_group], sets, reps, weight, notes)
+                summary = f"{sets}×{reps} @ {weight}kg"
+            # Nothing is written once the session has been ended (e.g. from Discord)
+            if not logged:
+                st.warning(f"⚠️ #{session_id} was already ended. Start a new session first.")
+                return
+            st.markdown(f'<div class="success-box"><h3>✅ Logged!</h3><p>{exercise}: {summary}</p></div>', 
+                      unsafe_allow_html=True)
+        except DatabaseError as e: st.error(f"❌ {e}")
+
+# Pages with their own widgets keep them in fragments, so browsing the library
+# or adjusting the weight input only reruns that part of the page.
+@st.fragment
+def library_tab():
+    lib_muscle = st.selectbox("Browse:", MUSCLE_KEYS)
+    st.write(f"### {lib_muscle}")
+    for ex in MUSCLE_GROUPS[lib_muscle]:
+        st.write(f"- {ex}")
+
+@st.fragment
+def weight_tab(user_id: int):
+    weight_input = st.number_input("Weight (kg)", 0.0, 999.99, value=70.0, step=0.1)
+    
+    if st.button("✅ Log Weight", use_container_width=True):
+        try:
+            log_weight_db(user_id, weight_input)
+            # No rerun: the chart below is drawn after this in the same run and
+            # re-reads the history log_weight_db just invalidated. Home is its
+            # own page and reads the new weight when opened.
+            st.success(f"✅ {weight_input} kg logged!")
+        except DatabaseError as e: st.error(f"❌ {e}")
+    
+    st.markdown("---")
+    try:
+        weight_hist = get_weight_history(user_id)
+        if weight_hist:
+            fig = weight_figure(tuple(tuple(r) for r in weight_hist))
+            st.plotly_chart(fig, use_container_width=True, config=PLOT_CONFIG)
+        else:
+            st.info("No logs yet!")
+    except DatabaseError as e: st.error(f"❌ {e}")
+
+@st.fragment
+def cardio_form(session_id: int, user_id: int, username: str):
+    machine = st.selectbox("Activity:", CARDIO_MACHINES)
+    duration = st.number_input("Duration (min)", 1, value=30)
+    c1, c2 = st.columns(2)
+    with c1: distance = st.number_input("Distance (km)", 0.0, step=0.1)
+    with c2: calories = st.number_input("Calories", 0)
+    notes = st.text_area("Notes", max_chars=200)
+    
+    if st.button("✅ Log Cardio", use_container_width=True):
+        try:
+            cardio_id = insert_cardio_db(session_id, user_id, username,
+                           CARDIO_NAMES[machine], duration, 
+                           distance if distance > 0 else None,
+                           calories if calories > 0 else None,
+                           notes if notes else None)
+            if cardio_id is None:
+                st.warning(f"⚠️ #{session_id} was already ended. Start a new session first.")
+                return
+            st.markdown(f'<div class="success-box"><h3>✅ Logged!</h3><p>{CARDIO_NAMES[machine]}: {duration}min • {calories}cal</p></div>', 
+                      unsafe_allow_html=True)
+        except DatabaseError as e: st.error(f"❌ {e}")
+
 # Session state
 if 'user_id' not in st.session_state:
     st.session_state.user_id = None
 if 'username' not in st.session_state:
     st.session_state.username = None
+if 'login_token' not in st.session_state:
+    st.session_state.login_token = None
+
+if _TOKEN_SECRET:
+    if st.session_state.user_id is None and "tok" in st.query_params:
+        restored = read_login_token(st.query_params["tok"])
+        if restored:
+            st.session_state.user_id, st.session_state.username = restored
+            st.session_state.login_token = st.query_params["tok"]
+        else:
+            del st.query_params["tok"]
+    # Page switches drop query params; put the token back so a refresh on
+    # any page stays logged in.
+    if st.session_state.login_token and st.query_params.get("tok") != st.session_state.login_token:
+        st.query_params["tok"] = st.session_state.login_token
 
 # Sidebar login
 with st.sidebar:
@@ -96,8 +330,13 @@ with st.sidebar:
                 if username_input and password_input:
                     user = authenticate_user(username_input, password_input)
                     if user:
-                        st.session_state.user_id = user[0]
-                        st.session_state.username = user[1]
+                        st.session_state.user_id = user.discord_id
+                        st.session_state.username = user.username
+                        if _TOKEN_SECRET:
+                            try:
+                                st.session_state.login_token = make_login_token(user)
+                            except Exception as e:
+                                st.error(f"Auth error: {e}")
                         st.success("✅ Login successful!")
                         st.rerun()
                     else:
@@ -106,232 +345,213 @@ with st.sidebar:
                     st.error("⚠️ Fill both fields!")
     else:
         st.success(f"👋 **{st.session_state.username}**")
+        # The read caches are per process, so a write made from Discord only
+        # shows up here once its entry expires (up to 60s); this skips the wait.
+        if st.button("🔄 Refresh data", use_container_width=True):
+            forget_cached_reads(st.session_state.user_id)
+            cached_history.clear()
+            cached_calories_by_day.clear()
+            st.rerun()
         if st.button("🚪 Logout", use_container_width=True):
+            if st.session_state.login_token:
+                revoke_login_tokens(st.session_state.username)
             st.session_state.user_id = None
             st.session_state.username = None
+            st.session_state.login_token = None
+            st.query_params.pop("tok", None)
             st.rerun()
 
 # Main app
-if st.session_state.user_id is None:
+# Each page is its own function behind st.navigation, so a rerun only executes
+# (and queries the DB for) the page that's open, where st.tabs ran every tab.
+def welcome_page():
     st.title("🏋️ Welcome to Fitness Tracker")
     st.markdown("### Please login from the sidebar")
-else:
-    tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs(
-        ["🏠 Home", "💪 Log", "🥗 Food", "📖 Library", "⚖️ Weight", "📊 Progress", "🏆 PRs", "❓ Help"])
+
+def home_page():
+    st.title("🏠 Dashboard")
+
+    # Recent completed sessions, loaded once per rerun: the Last metric and
+    # Recent Workouts are both slices of the same frame.
+    try:
+        recent_history, history_error = cached_history(st.session_state.user_id, 5), None
+    except DatabaseError as e:
+        recent_history, history_error = None, e
+    # Same for the active session: the metric, End button and end form all
+    # use it. gymbros caches a hit for 60s and "no active session" for 5s, so a
+    # start or end from Discord shows up here within those windows; the
+    # dashboard's own start_session/end_session calls pop the entry first.
+    try:
+        active, active_error = get_active_session(st.session_state.user_id), None
+    except DatabaseError as e:
+        active, active_error = None, e
+
+    c1, c2, c3 = st.columns(3)
     
-    # HOME
-    with tab1:
-        st.title("🏠 Dashboard")
-        c1, c2, c3 = st.columns(3)
-        
-        with c1:
-            try:
-                active = get_active_session(st.session_state.user_id)
-                st.metric("Session", f"#{active[0]}" if active else "None", "🟢" if active else "⚪")
-            except: st.metric("Session", "Error", "❌")
-        
-        with c2:
-            try:
-                history = get_history(st.session_state.user_id, 1)
-                st.metric("Last", history[0][1].strftime("%b %d") if history else "N/A", 
-                         f"{history[0][4] or 0} cal" if history else "")
-            except: st.metric("Last", "Error", "")
-        
-        with c3:
-            try:
-                weight_hist = get_weight_history(st.session_state.user_id)
-                st.metric("Weight", f"{weight_hist[0][1]} kg" if weight_hist else "N/A", "")
-            except: st.metric("Weight", "Error", "")
-        
-        st.markdown("---")
-        st.subheader("🎯 Session Control")
-        c1, c2 = st.columns(2)
-        
-        with c1:
-            if st.button("▶️ Start Session", use_container_width=True):
-                try:
-                    active = get_active_session(st.session_state.user_id)
-                    if active:
-                        st.error(f"⚠️ Active: #{active[0]}")
-                    else:
-                        sid = start_session(st.session_state.user_id, st.session_state.username)
-                        st.success(f"✅ Session #{sid}")
-                        st.rerun()
-                except DatabaseError as e: st.error(f"❌ {e}")
-        
-        with c2:
-            try:
-                active = get_active_session(st.session_state.user_id)
-                if active and st.button("⏹️ End Session", use_container_width=True):
-                    st.session_state.show_end_form = True
-                elif not active:
-                    st.button("⏹️ End Session", disabled=True, use_container_width=True)
-            except: pass
-        
-        if hasattr(st.session_state, 'show_end_form') and st.session_state.show_end_form:
-            try:
-                active = get_active_session(st.session_state.user_id)
-                if active:
-                    with st.form("end_form"):
-                        st.write(f"Ending #{active[0]}")
-                        calories = st.number_input("Calories 🔥", min_value=0, value=0)
-                        ca, cb = st.columns(2)
-                        with ca:
-                            if st.form_submit_button("✅ Confirm"):
-                                end_session(active[0], calories)
-                                st.success(f"✅ #{active[0]} ended!")
-                                st.session_state.show_end_form = False
-                                st.rerun()
-                        with cb:
-                            if st.form_submit_button("❌ Cancel"):
-                                st.session_state.show_end_form = False
-                                st.rerun()
-            except DatabaseError as e: st.error(f"❌ {e}")
-        
-        st.markdown("---")
-        st.subheader("📜 Recent Workouts")
-        try:
-            history = get_history(st.session_state.user_id, 5)
-            if history:
-                df = pd.DataFrame(history, columns=["ID", "Date", "Start", "End", "Calories"])
-                st.dataframe(df[['ID', 'Date', 'Calories']], use_container_width=True, hide_index=True)
-            else:
-                st.info("No sessions yet!")
-        except Exception as e: st.error(f"Error: {e}")
+    with c1:
+        if active_error is None:
+            st.metric("Session", f"#{active.session_id}" if active else "None", "🟢" if active else "⚪")
+        else: st.metric("Session", "Error", "❌")
     
-    # LOG
-    with tab2:
-        st.title("💪 Log Workout")
-        try:
-            active = get_active_session(st.session_state.user_id)
-            if not active:
-                st.warning("⚠️ Start a session first!")
-            else:
-                st.success(f"✅ Session #{active[0]}")
-                workout_type = st.radio("Type:", ["🏋️ Lift", "🏃 Cardio"], horizontal=True)
-                
-                if workout_type == "🏋️ Lift":
-                    muscle_group = st.selectbox("Muscle:", list(MUSCLE_GROUPS.keys()))
-                    exercise = st.selectbox("Exercise:", MUSCLE_GROUPS[muscle_group])
-                    c1, c2, c3 = st.columns(3)
-                    with c1: sets = st.number_input("Sets", 1, value=3)
-                    with c2: reps = st.number_input("Reps", 1, value=10)
-                    with c3: weight = st.number_input("Weight (kg)", 0, value=20)
-                    notes = st.text_area("Notes", max_chars=200)
-                    
-                    if st.button("✅ Log Lift", use_container_width=True):
-                        try:
-                            add_weightlift_db(active[0], st.session_state.user_id, st.session_state.username,
-                                            exercise, muscle_group.split(" ", 1)[1], sets, reps, weight, notes)
-                            st.markdown(f'<div class="success-box"><h3>✅ Logged!</h3><p>{exercise}: {sets}×{reps} @ {weight}kg</p></div>', 
-                                      unsafe_allow_html=True)
-                        except DatabaseError as e: st.error(f"❌ {e}")
-                else:
-                    machine = st.selectbox("Activity:", CARDIO_MACHINES)
-                    duration = st.number_input("Duration (min)", 1, value=30)
-                    c1, c2 = st.columns(2)
-                    with c1: distance = st.number_input("Distance (km)", 0.0, step=0.1)
-                    with c2: calories = st.number_input("Calories", 0)
-                    notes = st.text_area("Notes", max_chars=200)
-                    
-                    if st.button("✅ Log Cardio", use_container_width=True):
-                        try:
-                            insert_cardio_db(active[0], st.session_state.user_id, st.session_state.username,
-                                           machine.split(" ", 1)[1], duration, 
-                                           distance if distance > 0 else None,
-                                           calories if calories > 0 else None,
-                                           notes if notes else None)
-                            st.markdown(f'<div class="success-box"><h3>✅ Logged!</h3><p>{machine.split(" ",1)[1]}: {duration}min • {calories}cal</p></div>', 
-                                      unsafe_allow_html=True)
-                        except DatabaseError as e: st.error(f"❌ {e}")
-        except DatabaseError as e: st.error(f"❌ {e}")
+    with c2:
+        if history_error is None:
+            last = recent_history.iloc[0] if not recent_history.empty else None
+            st.metric("Last", last["Date"].strftime("%b %d") if last is not None else "N/A", 
+                     f"{0 if pd.isna(last['Calories']) else int(last['Calories'])} cal" if last is not None else "")
+        else: st.metric("Last", "Error", "")
     
-    # FOOD
-    with tab3:
-        st.title("🥗 Food Intake")
-        with st.form("food_form"):
-            f_date = st.date_input("Date", value=date.today())
-            f_meal = st.text_input("Meal Name")
-            c1, c2, c3 = st.columns(3)
-            with c1: f_prot = st.number_input("Protein (g)", 0.0)
-            with c2: f_carb = st.number_input("Carbs (g)", 0.0)
-            with c3: f_fats = st.number_input("Fats (g)", 0.0)
-            
-            if st.form_submit_button("✅ Log Meal"):
-                if f_meal:
-                    log_food_intake_db(st.session_state.user_id, f_date, f_meal, f_prot, f_carb, f_fats)
-                    st.success("✅ Meal logged!")
-                else:
-                    st.error("Enter meal name")
+    with c3:
+        try:
+            weight_hist = get_weight_history(st.session_state.user_id)
+            st.metric("Weight", f"{weight_hist[0].weight_kg} kg" if weight_hist else "N/A", "")
+        except DatabaseError: st.metric("Weight", "Error", "")
     
-    # LIBRARY
-    with tab4:
-        st.title("📖 Exercise Library")
-        lib_muscle = st.selectbox("Browse:", list(MUSCLE_GROUPS.keys()))
-        st.write(f"### {lib_muscle}")
-        for ex in MUSCLE_GROUPS[lib_muscle]:
-            st.write(f"- {ex}")
+    st.markdown("---")
+    st.subheader("🎯 Session Control")
+    c1, c2 = st.columns(2)
     
-    # WEIGHT
-    with tab5:
-        st.title("⚖️ Weight")
-        weight_input = st.number_input("Weight (kg)", 0.0, value=70.0, step=0.1)
-        
-        if st.button("✅ Log Weight", use_container_width=True):
+    with c1:
+        if st.button("▶️ Start Session", use_container_width=True):
             try:
-                log_weight_db(st.session_state.user_id, weight_input)
-                st.success(f"✅ {weight_input} kg logged!")
-                st.rerun()
+                sid = start_session(st.session_state.user_id, st.session_state.username)
+                if sid is None:
+                    # Started elsewhere; start_session dropped any cached
+                    # "no active session", so this reads the DB
+                    active = get_active_session(st.session_state.user_id)
+                    st.error(f"⚠️ Active: #{active.session_id if active else '?'}")
+                else:
+                    st.success(f"✅ Session #{sid}")
+                    st.rerun()
             except DatabaseError as e: st.error(f"❌ {e}")
-        
-        st.markdown("---")
-        try:
-            weight_hist = get_weight_history(st.session_state.user_id)
-            if weight_hist:
-                df = pd.DataFrame(weight_hist, columns=["Date", "Weight (kg)"]).sort_values("Date")
-                fig = px.line(df, x="Date", y="Weight (kg)", markers=True, title="Weight Trend")
-                fig.update_traces(line_color='#00C9FF')
-                st.plotly_chart(fig, use_container_width=True, config=PLOT_CONFIG)
-            else:
-                st.info("No logs yet!")
-        except Exception as e: st.error(f"Error: {e}")
     
-    # PROGRESS
-    with tab6:
-        st.title("📊 Progress")
-        try:
-            sessions = get_history(st.session_state.user_id, 20)
-            if sessions:
-                df = pd.DataFrame(sessions, columns=["ID", "Date", "Start", "End", "Calories"])
-                df['Date'] = pd.to_datetime(df['Date'])
-                fig = px.bar(df, x='Date', y='Calories', title="Calories Per Session")
-                st.plotly_chart(fig, use_container_width=True, config=PLOT_CONFIG)
-            else:
-                st.info("No data yet!")
-        except Exception as e: st.error(f"Error: {e}")
+    with c2:
+        if active_error is None:
+            if active and st.button("⏹️ End Session", use_container_width=True):
+                st.session_state.show_end_form = True
+            elif not active:
+                st.button("⏹️ End Session", disabled=True, use_container_width=True)
     
-    # PRs
-    with tab7:
-        st.title("🏆 PRs")
+    if hasattr(st.session_state, 'show_end_form') and st.session_state.show_end_form:
         try:
-            prs = get_personal_records(st.session_state.user_id)
-            if prs:
-                df = pd.DataFrame(prs, columns=["Exercise", "Max (kg)", "Date"])
-                st.dataframe(df, use_container_width=True, hide_index=True)
-            else:
-                st.info("No PRs yet!")
+            if active:
+                with st.form("end_form"):
+                    st.write(f"Ending #{active.session_id}")
+                    calories = st.number_input("Calories 🔥", min_value=0, value=0)
+                    ca, cb = st.columns(2)
+                    with ca:
+                        if st.form_submit_button("✅ Confirm"):
+                            ended = end_session(active.session_id, calories, st.session_state.user_id)
+                            cached_history.clear()
+                            cached_calories_by_day.clear()
+                            if ended:
+                                st.success(f"✅ #{active.session_id} ended!")
+                            else:
+                                st.warning(f"⚠️ #{active.session_id} was already ended.")
+                            st.session_state.show_end_form = False
+                            st.rerun()
+                    with cb:
+                        if st.form_submit_button("❌ Cancel"):
+                            st.session_state.show_end_form = False
+                            st.rerun()
         except DatabaseError as e: st.error(f"❌ {e}")
     
-    # HELP
-    with tab8:
-        st.title("❓ Help")
-        st.markdown("""
-        ### Navigation Guide
-        1. **🏠 Home** - Start/end sessions
-        2. **💪 Log** - Record workouts
-        3. **🥗 Food** - Track meals
-        4. **📖 Library** - Browse exercises
-        5. **⚖️ Weight** - Track weight
-        6. **📊 Progress** - View charts
-        7. **🏆 PRs** - See records
-        """)
+    st.markdown("---")
+    st.subheader("📜 Recent Workouts")
+    if history_error is None:
+        if not recent_history.empty:
+            st.dataframe(recent_history, use_container_width=True, hide_index=True)
+        else:
+            st.info("No sessions yet!")
+    else: st.error(f"Error: {history_error}")
+
+def log_page():
+    st.title("💪 Log Workout")
+    try:
+        active = get_active_session(st.session_state.user_id)
+        if not active:
+            st.warning("⚠️ Start a session first!")
+        else:
+            st.success(f"✅ Session #{active.session_id}")
+            workout_type = st.radio("Type:", ["🏋️ Lift", "🏃 Cardio"], horizontal=True)
+            
+            if workout_type == "🏋️ Lift":
+                lift_form(active.session_id, st.session_state.user_id, st.session_state.username)
+            else:
+                cardio_form(active.session_id, st.session_state.user_id, st.session_state.username)
+    except DatabaseError as e: st.error(f"❌ {e}")
+
+def food_page():
+    st.title("🥗 Food Intake")
+    with st.form("food_form"):
+        f_date = st.date_input("Date", value=date.today())
+        f_meal = st.text_input("Meal Name")
+        c1, c2, c3 = st.columns(3)
+        with c1: f_prot = st.number_input("Protein (g)", 0.0)
+        with c2: f_carb = st.number_input("Carbs (g)", 0.0)
+        with c3: f_fats = st.number_input("Fats (g)", 0.0)
+        
+        if st.form_submit_button("✅ Log Meal"):
+            if f_meal:
+                if log_food_intake_db(st.session_state.user_id, f_date, f_meal, f_prot, f_carb, f_fats):
+                    st.success("✅ Meal logged!")
+            else:
+                st.error("Enter meal name")
+
+def library_page():
+    st.title("📖 Exercise Library")
+    library_tab()
+
+def weight_page():
+    st.title("⚖️ Weight")
+    weight_tab(st.session_state.user_id)
+
+def progress_page():
+    st.title("📊 Progress")
+    try:
+        df = cached_calories_by_day(st.session_state.user_id)
+        if not df.empty:
+            fig = go.Figure(go.Bar(x=df["Date"].to_numpy(), y=df["Calories"].to_numpy()))
+            fig.update_layout(title="Calories Per Day (last 90 days)", xaxis_title="Date", yaxis_title="Calories")
+            st.plotly_chart(fig, use_container_width=True, config=PLOT_CONFIG)
+        else:
+            st.info("No data yet!")
+    except DatabaseError as e: st.error(f"❌ {e}")
+
+def prs_page():
+    st.title("🏆 PRs")
+    try:
+        prs = get_personal_records(st.session_state.user_id)
+        if prs:
+            df = pd.DataFrame(prs, columns=["Exercise", "Max (kg)", "Date"])
+            st.dataframe(df, use_container_width=True, hide_index=True)
+        else:
+            st.info("No PRs yet!")
+    except DatabaseError as e: st.error(f"❌ {e}")
+
+def help_page():
+    st.title("❓ Help")
+    st.markdown("""
+    ### Navigation Guide
+    1. **🏠 Home** - Start/end sessions
+    2. **💪 Log** - Record workouts
+    3. **🥗 Food** - Track meals
+    4. **📖 Library** - Browse exercises
+    5. **⚖️ Weight** - Track weight
+    6. **📊 Progress** - View charts
+    7. **🏆 PRs** - See records
+    """)
+
+if st.session_state.user_id is None:
+    pages = [st.Page(welcome_page, title="Welcome", icon="🏋️")]
+else:
+    pages = [
+        st.Page(home_page, title="Home", icon="🏠", default=True),
+        st.Page(log_page, title="Log", icon="💪"),
+        st.Page(food_page, title="Food", icon="🥗"),
+        st.Page(library_page, title="Library", icon="📖"),
+        st.Page(weight_page, title="Weight", icon="⚖️"),
+        st.Page(progress_page, title="Progress", icon="📊"),
+        st.Page(prs_page, title="PRs", icon="🏆"),
+        st.Page(help_page, title="Help", icon="❓"),
+    ]
+st.navigation(pages).run()
@@ -0,0 +1,61 @@
+"""Tests for the bulk entry parsers behind !add_lifts_bulk and !add_cardio_bulk."""
+import os
+
+import pytest
+
+for module in ("discord", "dotenv", "sqlalchemy", "pymysql"):
+    pytest.importorskip(module)
+
+# gymbros validates these at import; the parsers never touch the database.
+for var in ("DB_HOST", "DB_USER", "DB_PASSWORD", "DB_NAME", "DISCORD_TOKEN"):
+    os.environ.setdefault(var, "test")
+
+from discord.ext import commands
+
+import gymbros
+
+
+def test_lift_entries_parse_required_and_optional_fields():
+    assert gymbros._parse_lift_entries("Bench,Chest,3,10,80;Squat,Legs,5,5,100,heavy") == [
+        ("Bench", "Chest", 3, 10, 80, None),
+        ("Squat", "Legs", 5, 5, 100, "heavy"),
+    ]
+
+
+@pytest.mark.parametrize("entry, field", [
+    (",Chest,3,10,80", "exercise"),
+    ("Bench,,3,10,80", "muscle"),
+    ("Bench,Chest,,10,80", "sets"),
+    ("Bench,Chest,3, ,80", "reps"),
+    ("Bench,Chest,3,10,", "kg"),
+])
+def test_lift_entries_reject_blank_required_field(entry, field):
+    with pytest.raises(commands.BadArgument, match=f"Entry 1 is missing {field}"):
+        gymbros._parse_lift_entries(entry)
+
+
+def test_blank_required_field_reports_its_entry():
+    with pytest.raises(commands.BadArgument, match="Entry 2 is missing sets"):
+        gymbros._parse_lift_entries("Bench,Chest,3,10,80\nRow,Back,,10,60")
+
+
+def test_entry_numbers_skip_blank_segments():
+    with pytest.raises(commands.BadArgument, match="Entry 2 has an invalid number"):
+        gymbros._parse_cardio_entries("Treadmill,30;;\n  \nBike,x")
+
+
+def test_cardio_entries_parse_required_and_optional_fields():
+    assert gymbros._parse_cardio_entries("Treadmill,30;Bike,20,8.5,150") == [
+        ("Treadmill", 30, None, None, None),
+        ("Bike", 20, 8.5, 150, None),
+    ]
+
+
+@pytest.mark.parametrize("entry, field", [
+    (",30", "machine"),
+    ("  ,30,5", "machine"),
+    ("Treadmill,", "mins"),
+])
+def test_cardio_entries_reject_blank_required_field(entry, field):
+    with pytest.raises(commands.BadArgument, match=f"Entry 1 is missing {field}"):
+        gymbros._parse_cardio_entries(entry)